@@ -0,0 +1,14 @@
+# JSON encoding shared by the client modules (relay_server.py, deployed alone, keeps its own).
+# dumps returns compact UTF-8 bytes with either backend, so peers see one wire format.
+
+try:
+    import orjson  # optional C encoder/decoder
+    dumps = orjson.dumps
+    loads = orjson.loads
+except ImportError:  # fall back to the stdlib
+    import json
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    loads = json.loads
@@ -5,14 +5,18 @@ Handles cross-network peer discovery when local network discovery isn't sufficie
 """
 
 from __future__ import annotations
-import json
+import heapq
 import socket
 import threading
 import time
-import urllib.request
-import urllib.parse
-import urllib.error
-from typing import Dict, List, Optional, Callable
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Callable, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from net._json import dumps as _dumps, loads as _loads
 
 # Default relay server (you can change this to your own server)
 DEFAULT_RELAY_HOST = "p2p-relay.glitch.me"  # Free hosting service
@@ -37,12 +41,24 @@ class GlobalDiscovery:
         
         # State
         self._running = threading.Event()
+        self._wake = threading.Event()  # set by stop() to cut the inter-update wait short
         self._peers: Dict[str, Dict] = {}  # peer_id -> peer_info
+        self._deadlines: Dict[str, float] = {}  # peer_id -> time.monotonic() deadline
+        self._expiry: List[Tuple[float, str]] = []  # min-heap of (deadline, peer_id)
         self._lock = threading.Lock()
+        # False once the relay rejects 'update_and_list' (older relays): use 'update' + 'list'
+        self._combined_sync = True
         self._update_thread: Optional[threading.Thread] = None
         
+        # Keep-alive HTTP session so relay calls reuse one TLS connection
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        
         # Public IP detection
         self.public_ip: Optional[str] = None
+        self._peer_id = self._make_peer_id()
         self._detect_public_ip()
     
     def start(self):
@@ -52,6 +68,7 @@ class GlobalDiscovery:
             return
         
         self._running.set()
+        self._wake.clear()
         self._update_thread = threading.Thread(target=self._update_loop, daemon=True)
         self._update_thread.start()
         
@@ -61,6 +78,7 @@ class GlobalDiscovery:
     def stop(self):
         """Stop global discovery service."""
         self._running.clear()
+        self._wake.set()
         if self._update_thread:
             self._update_thread.join(timeout=2.0)
         
@@ -69,19 +87,27 @@ class GlobalDiscovery:
             self._remove_presence()
         except Exception:
             pass
+        self._session.close()
     
     def get_global_peers(self) -> List[Dict]:
         """Get list of peers discovered globally."""
         with self._lock:
-            now = time.time()
-            # Filter expired peers
-            expired = [peer_id for peer_id, peer_info in self._peers.items() 
-                      if now - peer_info.get('last_seen', 0) > self.peer_ttl]
-            for peer_id in expired:
-                del self._peers[peer_id]
-            
+            self._evict_expired(time.monotonic())
             return list(self._peers.values())
     
+    def _evict_expired(self, now: float):
+        """Drop peers whose TTL elapsed; caller holds the lock."""
+        # Pop due expirations; skip heap entries superseded by a newer deadline
+        while self._expiry and self._expiry[0][0] < now:
+            deadline, peer_id = heapq.heappop(self._expiry)
+            if self._deadlines.get(peer_id) == deadline:
+                del self._deadlines[peer_id]
+                del self._peers[peer_id]
+        # Every sync pushes a fresh deadline per peer; rebuild once superseded entries pile up
+        if len(self._expiry) > 4 * len(self._deadlines) + 64:
+            self._expiry = [(deadline, peer_id) for peer_id, deadline in self._deadlines.items()]
+            heapq.heapify(self._expiry)
+    
     def _detect_public_ip(self):
         """Detect our public IP address."""
         try:
@@ -92,34 +118,43 @@ class GlobalDiscovery:
                 "https://checkip.amazonaws.com"
             ]
             
-            for service in services:
-                try:
-                    with urllib.request.urlopen(service, timeout=5) as response:
-                        self.public_ip = response.read().decode('utf-8').strip()
-                        if self.public_ip:
-                            break
-                except Exception:
-                    continue
+            def _fetch(url: str) -> str:
+                return self._session.get(url, timeout=5).text.strip()
+            
+            # Query all services at once and take the first answer
+            ex = ThreadPoolExecutor(max_workers=len(services))
+            try:
+                futures = {ex.submit(_fetch, url): url for url in services}
+                for future in as_completed(futures, timeout=6):
+                    try:
+                        ip = future.result()
+                    except Exception:
+                        continue
+                    if ip:
+                        self.public_ip = ip
+                        self._peer_id = self._make_peer_id()
+                        break
+            finally:
+                ex.shutdown(wait=False, cancel_futures=True)
                     
         except Exception as e:
             print(f"Failed to detect public IP: {e}")
             self.public_ip = None
+            self._peer_id = self._make_peer_id()
     
     def _update_loop(self):
         """Main update loop - runs in background thread."""
-        while self._running.is_set():
+        is_running = self._running.is_set
+        while is_running():
             try:
-                self._update_presence()
-                self._fetch_peers()
+                self._update_and_fetch()
                 self.on_peer_update()
             except Exception as e:
                 print(f"Global discovery error: {e}")
             
-            # Wait for next update
-            for _ in range(int(self.update_interval * 10)):
-                if not self._running.is_set():
-                    break
-                time.sleep(0.1)
+            # Wait for next update (returns early when stop() sets the wake event)
+            if self._wake.wait(self.update_interval):
+                break
     
     def _update_presence(self):
         """Update our presence on the relay server."""
@@ -128,7 +163,7 @@ class GlobalDiscovery:
             
         data = {
             'action': 'update',
-            'peer_id': self._get_peer_id(),
+            'peer_id': self._peer_id,
             'name': self.name,
             'public_ip': self.public_ip,
             'tcp_port': self.tcp_port,
@@ -140,29 +175,57 @@ class GlobalDiscovery:
         except Exception as e:
             print(f"Failed to update presence: {e}")
     
-    def _fetch_peers(self):
-        """Fetch list of peers from relay server."""
-        data = {
-            'action': 'list',
-            'exclude': self._get_peer_id()
-        }
+    def _update_and_fetch(self):
+        """Update our presence and fetch the peer list, in one relay round-trip when supported."""
+        if not self.public_ip:
+            return
         
-        try:
+        response = None
+        if self._combined_sync:
+            data = {
+                'action': 'update_and_list',
+                'peer_id': self._peer_id,
+                'name': self.name,
+                'public_ip': self.public_ip,
+                'tcp_port': self.tcp_port,
+                'timestamp': time.time(),
+                'exclude': self._peer_id
+            }
             response = self._send_to_relay(data)
-            if response and 'peers' in response:
-                with self._lock:
+            # None is a network error (already reported): keep the combined call and retry next cycle
+            if response is not None and (not isinstance(response, dict) or 'peers' not in response):
+                error = response.get('error') if isinstance(response, dict) else response
+                print(f"Relay rejected update_and_list ({error}); using separate update + list")
+                self._combined_sync = False
+        
+        if not self._combined_sync:
+            self._update_presence()
+            response = self._send_to_relay({'action': 'list', 'exclude': self._peer_id})
+        
+        try:
+            # last_seen is the relay's wall clock; convert its age to a local monotonic deadline once
+            wall_now, mono_now = time.time(), time.monotonic()
+            with self._lock:
+                if isinstance(response, dict) and 'peers' in response:
                     for peer_info in response['peers']:
                         peer_id = peer_info.get('peer_id')
                         if peer_id:
+                            age = max(0.0, wall_now - peer_info.get('last_seen', 0))
+                            deadline = mono_now + self.peer_ttl - age
                             self._peers[peer_id] = peer_info
+                            if self._deadlines.get(peer_id) != deadline:
+                                self._deadlines[peer_id] = deadline
+                                heapq.heappush(self._expiry, (deadline, peer_id))
+                # don't rely on readers: the UI skips get_global_peers() while the tab is hidden
+                self._evict_expired(mono_now)
         except Exception as e:
-            print(f"Failed to fetch peers: {e}")
+            print(f"Failed to sync with relay: {e}")
     
     def _remove_presence(self):
         """Remove our presence from relay server."""
         data = {
             'action': 'remove',
-            'peer_id': self._get_peer_id()
+            'peer_id': self._peer_id
         }
         
         try:
@@ -173,28 +236,23 @@ class GlobalDiscovery:
     def _send_to_relay(self, data: Dict) -> Optional[Dict]:
         """Send data to relay server and get response."""
         try:
-            # Prepare request
-            json_data = json.dumps(data).encode('utf-8')
-            
-            req = urllib.request.Request(
+            response = self._session.post(
                 f"{self.relay_url}/api",
-                data=json_data,
-                headers={'Content-Type': 'application/json'}
+                data=_dumps(data),
+                headers={'Content-Type': 'application/json'},
+                timeout=10
             )
-            
-            with urllib.request.urlopen(req, timeout=10) as response:
-                response_data = response.read().decode('utf-8')
-                return json.loads(response_data)
+            return _loads(response.content)
                 
-        except urllib.error.URLError as e:
+        except requests.exceptions.RequestException as e:
             print(f"Network error communicating with relay: {e}")
             return None
         except Exception as e:
             print(f"Error communicating with relay: {e}")
             return None
     
-    def _get_peer_id(self) -> str:
-        """Generate unique peer ID."""
+    def _make_peer_id(self) -> str:
+        """Generate unique peer ID (cached in self._peer_id whenever public_ip changes)."""
         return f"{self.name}@{self.public_ip}:{self.tcp_port}"
 
 
@@ -205,8 +263,47 @@ class RelayServer:
     """
     
     def __init__(self):
-        self.peers: Dict[str, Dict] = {}
+        # Kept in last-update order: with one TTL for everyone, the oldest entry expires first
+        self.peers: "OrderedDict[str, Dict]" = OrderedDict()
         self.lock = threading.Lock()
+        self.peer_ttl = 30.0  # 30 seconds TTL
+        self.list_cache_ttl = 0.25  # list requests within this window share one result
+        self.janitor_interval = 5.0  # seconds between expired-peer sweeps
+        # Writers publish an immutable snapshot under the lock; list requests read it lock-free
+        self._peers_snapshot: Tuple[Dict, ...] = ()
+        # (built_at, active peers) served to every list request inside list_cache_ttl
+        self._list_cache: Tuple[float, List[Dict]] = (0.0, [])
+        
+        # Expiry runs in the background so list requests never pay for eviction
+        self._stopped = threading.Event()
+        self._janitor = threading.Thread(target=self._janitor_loop, daemon=True)
+        self._janitor.start()
+    
+    def stop(self):
+        """Stop the background janitor."""
+        self._stopped.set()
+    
+    def _publish(self):
+        """Republish the snapshot; caller holds the lock."""
+        self._peers_snapshot = tuple(self.peers.values())
+    
+    def _evict_expired(self, now: float) -> bool:
+        """Pop expired peers off the old end; caller holds the lock. O(expired)."""
+        removed = False
+        while self.peers:
+            peer_info = next(iter(self.peers.values()))
+            if now - peer_info.get('last_seen', 0) <= self.peer_ttl:
+                break
+            self.peers.popitem(last=False)
+            removed = True
+        return removed
+    
+    def _janitor_loop(self):
+        """Periodically evict expired peers (covers idle periods with no updates)."""
+        while not self._stopped.wait(self.janitor_interval):
+            with self.lock:
+                if self._evict_expired(time.time()):
+                    self._publish()
     
     def handle_request(self, data: Dict) -> Dict:
         """Handle incoming request from peer."""
@@ -216,6 +313,8 @@ class RelayServer:
             return self._handle_update(data)
         elif action == 'list':
             return self._handle_list(data)
+        elif action == 'update_and_list':
+            return self._handle_update_and_list(data)
         elif action == 'remove':
             return self._handle_remove(data)
         else:
@@ -228,43 +327,51 @@ class RelayServer:
             return {'error': 'Missing peer_id'}
         
         with self.lock:
+            now = time.time()
             self.peers[peer_id] = {
                 'peer_id': peer_id,
                 'name': data.get('name', 'Unknown'),
                 'public_ip': data.get('public_ip'),
                 'tcp_port': data.get('tcp_port'),
-                'last_seen': time.time()
+                'last_seen': now
             }
+            self.peers.move_to_end(peer_id)
+            self._evict_expired(now)
+            self._publish()
         
         return {'status': 'updated'}
     
     def _handle_list(self, data: Dict) -> Dict:
         """Handle peer list request."""
         exclude = data.get('exclude')
-        ttl = 30.0  # 30 seconds TTL
+        now = time.time()
         
-        with self.lock:
-            now = time.time()
-            # Clean expired peers
-            expired = [peer_id for peer_id, peer_info in self.peers.items()
-                      if now - peer_info.get('last_seen', 0) > ttl]
-            for peer_id in expired:
-                del self.peers[peer_id]
-            
-            # Get active peers
-            active_peers = []
-            for peer_id, peer_info in self.peers.items():
-                if peer_id != exclude:
-                    active_peers.append(peer_info.copy())
+        # Rebuild from the published snapshot (no lock needed) at most once per window
+        built_at, cached = self._list_cache
+        if now - built_at >= self.list_cache_ttl:
+            cached = [peer_info for peer_info in self._peers_snapshot
+                      if now - peer_info.get('last_seen', 0) <= self.peer_ttl]
+            self._list_cache = (now, cached)
+        
+        active_peers = [peer_info.copy() for peer_info in cached
+                        if peer_info['peer_id'] != exclude]
         
         return {'peers': active_peers}
     
+    def _handle_update_and_list(self, data: Dict) -> Dict:
+        """Handle a combined presence update + peer list request."""
+        result = self._handle_update(data)
+        if 'error' in result:
+            return result
+        return self._handle_list(data)
+    
     def _handle_remove(self, data: Dict) -> Dict:
         """Handle peer removal."""
         peer_id = data.get('peer_id')
         if peer_id:
             with self.lock:
                 self.peers.pop(peer_id, None)
+                self._publish()
         
         return {'status': 'removed'}
 
@@ -282,9 +389,9 @@ def create_flask_server():
         @app.route('/api', methods=['POST'])
         def api():
             try:
-                data = request.get_json()
+                data = _loads(request.get_data())
                 response = relay.handle_request(data)
-                return jsonify(response)
+                return app.response_class(_dumps(response), mimetype='application/json')
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
         
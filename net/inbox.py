@@ -3,14 +3,19 @@
 TCP inbound listener.
 - Binds to host/port (port=0 to auto-pick a free port).
 - Accepts connections and hands (conn, addr) off to a UI callback on the main thread via queue.
+- Accepting runs on a selector loop; callbacks run on a small thread pool so a slow
+  callback never holds up new accepts.
 """
 
 from __future__ import annotations
+import selectors
 import socket
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable, Optional
 
 TCP_BACKLOG = 10
+CALLBACK_WORKERS = 4
 
 
 class InboxServer:
@@ -23,6 +28,10 @@ class InboxServer:
         self._server: Optional[socket.socket] = None
         self._running = threading.Event()
         self._th: Optional[threading.Thread] = None
+        self._sel: Optional[selectors.BaseSelector] = None
+        self._wake_r: Optional[socket.socket] = None
+        self._wake_w: Optional[socket.socket] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
 
     def start(self, host: str = "0.0.0.0", port: int = 0) -> int:
         """Start listener; returns the actual bound port (useful when port=0)."""
@@ -30,6 +39,14 @@ class InboxServer:
         srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         srv.bind((host, port))  # port=0 => OS chooses a free port
         srv.listen(TCP_BACKLOG)
+        srv.setblocking(False)
+
+        # socketpair lets stop() interrupt select()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._sel = selectors.DefaultSelector()
+        self._sel.register(srv, selectors.EVENT_READ)
+        self._sel.register(self._wake_r, selectors.EVENT_READ)
+        self._pool = ThreadPoolExecutor(max_workers=CALLBACK_WORKERS)
 
         self._server = srv
         self._running.set()
@@ -38,26 +55,58 @@ class InboxServer:
         return srv.getsockname()[1]
 
     def _acceptor(self) -> None:
-        while self._running.is_set():
-            try:
-                conn, addr = self._server.accept()
-            except OSError:
-                break
-            # hand off for UI to open a window
+        srv, sel, pool = self._server, self._sel, self._pool
+        try:
+            while self._running.is_set():
+                for key, _mask in sel.select():
+                    if key.fileobj is not srv:
+                        return  # woken by stop()
+                    # drain every pending connection before selecting again
+                    while True:
+                        try:
+                            conn, addr = srv.accept()
+                        except (BlockingIOError, InterruptedError):
+                            break
+                        conn.setblocking(True)
+                        # hand off for UI to open a window
+                        try:
+                            pool.submit(self._dispatch, conn, addr)
+                        except RuntimeError:
+                            # stop() shut the pool down after its join timed out
+                            conn.close()
+                            return
+        except (OSError, ValueError):
+            pass  # listener closed
+        finally:
+            sel.close()
+
+    def _dispatch(self, conn: socket.socket, addr: tuple) -> None:
+        try:
+            self.on_incoming(conn, addr)
+        except Exception:
+            # If UI callback crashes we must close the socket to avoid leaks.
             try:
-                self.on_incoming(conn, addr)
+                conn.close()
             except Exception:
-                # If UI callback crashes we must close the socket to avoid leaks.
-                try:
-                    conn.close()
-                except Exception:
-                    pass
+                pass
 
     def stop(self) -> None:
         self._running.clear()
-        if isinstance(self._server, socket.socket):
+        if isinstance(self._wake_w, socket.socket):
             try:
-                self._server.close()
-            except Exception:
+                self._wake_w.send(b"\0")
+            except OSError:
                 pass
+        if self._th:
+            self._th.join(timeout=2.0)
+        for s in (self._server, self._wake_r, self._wake_w):
+            if isinstance(s, socket.socket):
+                try:
+                    s.close()
+                except Exception:
+                    pass
+        if self._pool:
+            self._pool.shutdown(wait=False)
         self._server = None
+        self._wake_r = self._wake_w = None
+        self._pool = None
@@ -1,29 +1,25 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 import queue
+import selectors
 import socket
 import threading
-from typing import Callable, Optional
+from typing import Callable, List, Optional
+
+RECV_CHUNK = 65536      # bytes pulled per recv() syscall
+SOCK_BUF_SIZE = 262144  # SO_RCVBUF / SO_SNDBUF request for chat sockets
+MAX_BATCH = 256         # most lines handed to the UI per poll_recv() call
+CLOSE_FLUSH_TIMEOUT = 2.0  # seconds the writer gets to flush on close before the socket is shut down
 
 def _make_line_protocol():
-    buf = bytearray()
-    lock = threading.Lock()
-
-    def feed(data: bytes):
-        out = []
-        with lock:
-            buf.extend(data)
-            while True:
-                i = buf.find(b"\n")
-                if i == -1:
-                    break
-                line = buf[:i]
-                del buf[:i+1]
-                try:
-                    out.append(line.decode("utf-8", errors="replace"))
-                except Exception:
-                    out.append("<decode error>")
-        return out
+    # Partial line carried over between chunks; feed() is only called from the reader.
+    tail = b""
+
+    def feed(data):  # bytes or memoryview
+        nonlocal tail
+        parts = (tail + data).split(b"\n")
+        tail = parts[-1]
+        return [line.decode("utf-8", errors="replace") for line in parts[:-1]]
 
     def encode(msg: str) -> bytes:
         return (msg + "\n").encode("utf-8")
@@ -31,15 +27,100 @@ def _make_line_protocol():
     return feed, encode
 
 
+class _IOReactor:
+    """
+    One background thread multiplexing every PeerConn socket on a selector.
+    Idle connections cost no wakeups; a socketpair interrupts select() when
+    sockets are added or removed from other threads.
+    """
+    def __init__(self):
+        self._sel = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._sel.register(self._wake_r, selectors.EVENT_READ, None)
+        # (op, sock, callback) applied by the reactor thread, in order
+        self._ops: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._th: Optional[threading.Thread] = None
+
+    def register(self, sock: socket.socket, callback: Callable[[socket.socket], None]) -> None:
+        self._ops.put(("add", sock, callback))
+        self._wakeup()
+        with self._lock:
+            if self._th is None:
+                self._th = threading.Thread(target=self._run, daemon=True)
+                self._th.start()
+
+    def unregister(self, sock: socket.socket) -> None:
+        self._ops.put(("del", sock, None))
+        self._wakeup()
+
+    def _wakeup(self) -> None:
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass  # buffer full => the reactor is already due to wake
+
+    def _apply_ops(self) -> None:
+        while True:
+            try:
+                op, sock, callback = self._ops.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if op == "add":
+                    self._sel.register(sock, selectors.EVENT_READ, callback)
+                else:
+                    self._sel.unregister(sock)
+            except (KeyError, ValueError, OSError):
+                pass  # already closed / never registered
+
+    def _run(self) -> None:
+        while True:
+            self._apply_ops()
+            try:
+                events = self._sel.select()
+            except OSError:
+                continue  # a socket was closed under us; its unregister op is queued
+            for key, _mask in events:
+                if key.data is None:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    key.data(key.fileobj)
+                except Exception:
+                    pass
+
+
+_reactor = _IOReactor()
+
+
 class PeerConn:
-    """A single chat connection with queue-based delivery for UI threads."""
-    def __init__(self, ui_callback: Callable[[str], None]):
+    """
+    A single chat connection with queue-based delivery for UI threads.
+    ui_callback receives a list of lines per poll so the UI can update once per batch.
+    If notify is given it is called (from whichever thread queued the lines) when
+    lines become available, at most once per poll_recv(), so the UI can drain on
+    demand instead of polling on a timer.
+    """
+    def __init__(self, ui_callback: Callable[[List[str]], None],
+                 notify: Optional[Callable[[], None]] = None):
         self._sock: Optional[socket.socket] = None
-        self._stop_evt = threading.Event()
         self._recv_q: "queue.Queue[str]" = queue.Queue()
+        self._notify = notify
+        self._notify_pending = False  # set once notified, cleared when poll_recv drains
+        # encoded frames for the current connection's writer; None tells it to finish
+        self._send_q: "Optional[queue.Queue[Optional[bytes]]]" = None
         self._ui_callback = ui_callback
         self._feed, self._encode = _make_line_protocol()
-        self._reader_thread: Optional[threading.Thread] = None
+        # reused receive buffer; only the reactor thread touches it
+        self._rxbuf = bytearray(RECV_CHUNK)
+        self._rxview = memoryview(self._rxbuf)
         self._lock = threading.Lock()
 
     # ---------------- utils ----------------
@@ -49,6 +130,18 @@ class PeerConn:
         except OSError:
             pass  # not critical
 
+    def _tune_socket(self, s: socket.socket):
+        # low latency for small chat lines, larger kernel buffers for bursts
+        for level, opt, val in (
+            (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+            (socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_BUF_SIZE),
+            (socket.SOL_SOCKET, socket.SO_SNDBUF, SOCK_BUF_SIZE),
+        ):
+            try:
+                s.setsockopt(level, opt, val)
+            except OSError:
+                pass  # not critical
+
     def is_connected(self) -> bool:
         return isinstance(self._sock, socket.socket)
 
@@ -60,21 +153,18 @@ class PeerConn:
         try:
             s.connect((host, port))
         except Exception as e:
-            self._recv_q.put(f"[error] Could not connect: {e}")
+            self._push(f"[error] Could not connect: {e}")
             try: s.close()
             except Exception: pass
             return False
 
         s.settimeout(None)  # blocking
         self._enable_keepalive(s)
+        self._tune_socket(s)
 
-        with self._lock:
-            self._sock = s
-            self._stop_evt.clear()
-            self._reader_thread = threading.Thread(target=self._reader, args=(s,), daemon=True)
-            self._reader_thread.start()
+        self._attach(s)
 
-        self._recv_q.put(f"[system] Connected to {host}:{port}")
+        self._push(f"[system] Connected to {host}:{port}")
         return True
 
     def adopt(self, sock: socket.socket, addr) -> None:
@@ -82,80 +172,153 @@ class PeerConn:
         try: sock.settimeout(None)
         except Exception: pass
         self._enable_keepalive(sock)
+        self._tune_socket(sock)
 
+        self._attach(sock)
+
+        self._push(f"[system] Incoming connection from {addr[0]}:{addr[1]}")
+
+    def _attach(self, sock: socket.socket) -> None:
+        send_q: "queue.Queue[Optional[bytes]]" = queue.Queue()
         with self._lock:
             self._sock = sock
-            self._stop_evt.clear()
-            self._reader_thread = threading.Thread(target=self._reader, args=(sock,), daemon=True)
-            self._reader_thread.start()
-
-        self._recv_q.put(f"[system] Incoming connection from {addr[0]}:{addr[1]}")
+            self._send_q = send_q
+        threading.Thread(target=self._writer, args=(sock, send_q), daemon=True).start()
+        _reactor.register(sock, self._on_readable)
 
     # ---------------- reader ----------------
-    def _reader(self, conn: socket.socket) -> None:
+    def _on_readable(self, conn: socket.socket) -> None:
         """
-        Blocking recv loop; only exits when:
+        Reactor callback, runs on the shared I/O thread. Does one recv per
+        readiness event (the selector is level-triggered and reports again if
+        more is queued) and closes when:
         - peer cleanly closes (recv() == b"")
         - a real socket error occurs
-        - stop event is set from close()
         """
+        if conn is not self._sock:
+            return  # stale event for a socket we already closed
         try:
-            conn.settimeout(0.6)  # short timeout to allow graceful stop polling
-            while not self._stop_evt.is_set():
+            n = conn.recv_into(self._rxbuf)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self._push(f"[error] recv failed: {e}")
+            self._safe_close()
+            return
+
+        if not n:
+            # peer closed
+            self._push("[system] Peer closed the connection.")
+            self._safe_close()
+            return
+
+        # feed() joins the view onto its carried tail, copying it exactly once
+        lines = self._feed(self._rxview[:n])
+        if lines:
+            for line in lines:
+                self._recv_q.put(line)
+            self._wake_ui()
+
+    # ---------------- writer ----------------
+    def _writer(self, conn: socket.socket, send_q: "queue.Queue[Optional[bytes]]") -> None:
+        """
+        Blocks until a frame is queued, then coalesces everything else already
+        waiting into a single sendall(). Owns the final close of its socket so
+        frames queued before close() are still flushed.
+        """
+        done = False
+        try:
+            while not done:
+                frame = send_q.get()
+                if frame is None:
+                    break
+                frames = [frame]
                 try:
-                    data = conn.recv(4096)
-                except socket.timeout:
-                    continue  # keep waiting
-                except OSError as e:
-                    self._recv_q.put(f"[error] recv failed: {e}")
+                    while True:
+                        frame = send_q.get_nowait()
+                        if frame is None:
+                            done = True
+                            break
+                        frames.append(frame)
+                except queue.Empty:
+                    pass
+                try:
+                    conn.sendall(b"".join(frames))
+                except Exception as e:
+                    if conn is self._sock:
+                        # surface the error and close; UI will see it
+                        self._push(f"[error] send failed: {e}")
+                        self._safe_close()
                     break
+        finally:
+            try:
+                # avoid SHUT_RDWR on half-closed sockets on macOS that may raise
+                conn.close()
+            except Exception:
+                pass
 
-                if not data:
-                    # peer closed
-                    self._recv_q.put("[system] Peer closed the connection.")
-                    break
+    # ---------------- delivery ----------------
+    def _push(self, line: str) -> None:
+        self._recv_q.put(line)
+        self._wake_ui()
 
-                for line in self._feed(data):
-                    self._recv_q.put(line)
-        except Exception as e:
-            self._recv_q.put(f"[error] {e}")
-        finally:
-            # mark disconnected exactly once
-            self._recv_q.put("[system] Disconnected.")
-            self._safe_close()
+    def _wake_ui(self) -> None:
+        if self._notify is None or self._notify_pending:
+            return
+        self._notify_pending = True
+        try:
+            self._notify()
+        except Exception:
+            pass  # UI already gone
 
     # ---------------- send / poll ----------------
     def send(self, msg: str) -> None:
-        if not isinstance(self._sock, socket.socket):
-            self._recv_q.put("[error] Not connected.")
+        send_q = self._send_q
+        if not isinstance(self._sock, socket.socket) or send_q is None:
+            self._push("[error] Not connected.")
             return
-        try:
-            self._sock.sendall(self._encode(msg))
-        except Exception as e:
-            # surface the error and close; UI will see it
-            self._recv_q.put(f"[error] send failed: {e}")
-            self._safe_close()
+        send_q.put(self._encode(msg))
 
-    def poll_recv(self) -> None:
+    def poll_recv(self, max_batch: int = MAX_BATCH) -> None:
+        # cleared before draining: anything queued from here on triggers a fresh notify
+        self._notify_pending = False
+        lines: List[str] = []
         try:
-            while True:
-                line = self._recv_q.get_nowait()
-                self._ui_callback(line)
+            while len(lines) < max_batch:
+                lines.append(self._recv_q.get_nowait())
         except queue.Empty:
             pass
+        if len(lines) >= max_batch:
+            self._wake_ui()  # more may be waiting; come back for the next batch
+        if lines:
+            self._ui_callback(lines)
 
     # ---------------- close ----------------
     def _safe_close(self):
         """Internal: close without re-entrancy problems."""
         with self._lock:
-            if isinstance(self._sock, socket.socket):
-                try:
-                    # avoid SHUT_RDWR on half-closed sockets on macOS that may raise
-                    self._sock.close()
-                except Exception:
-                    pass
-            self._sock = None
-            self._stop_evt.set()
+            sock, self._sock = self._sock, None
+            send_q, self._send_q = self._send_q, None
+        if isinstance(sock, socket.socket):
+            _reactor.unregister(sock)
+            if send_q is not None:
+                send_q.put(None)  # writer flushes what's queued, then closes the socket
+                # ...unless a peer that stopped reading has it stuck in sendall()
+                timer = threading.Timer(CLOSE_FLUSH_TIMEOUT, self._force_shutdown, args=(sock,))
+                timer.daemon = True
+                timer.start()
+            # mark disconnected exactly once
+            self._push("[system] Disconnected.")
+
+    @staticmethod
+    def _force_shutdown(sock: socket.socket) -> None:
+        """Unblock a stalled writer; it then closes the socket itself."""
+        if sock.fileno() == -1:
+            return  # writer already closed it
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
 
     def close(self) -> None:
         self._safe_close()
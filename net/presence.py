@@ -9,28 +9,46 @@ Multiple processes can bind the same UDP port via SO_REUSEADDR (and SO_REUSEPORT
 """
 
 from __future__ import annotations
-import json
+import heapq
 import socket
 import threading
 import time
 from typing import Dict, List, Tuple
 
+from net._json import dumps as _dumps, loads as _loads
+
 BCAST_PORT = 54545          # shared UDP discovery port
 BCAST_INTERVAL = 2.5        # seconds between beacons
 PEER_TTL = 8.0              # seconds until peer considered offline
+BEACON_CACHE_MAX = 256      # distinct raw beacons remembered to skip re-parsing
 
 
 class Presence:
     def __init__(self, name: str, tcp_port: int):
         self.name = name
         self.tcp_port = tcp_port
+        # name/port never change, so the beacon is encoded once
+        self._beacon_bytes = _dumps({"name": self.name, "port": self.tcp_port})
 
         self._running = threading.Event()
         self._running.set()
+        self._wake = threading.Event()  # set by stop() to interrupt the beacon sleep
 
         self._lock = threading.Lock()
         # key: (ip, port) -> {"name": str, "ip": str, "port": int, "last_seen": float}
         self._peers: Dict[Tuple[str, int], Dict] = {}
+        # key -> time.monotonic() deadline; kept out of the peer dicts handed to callers
+        self._deadlines: Dict[Tuple[str, int], float] = {}
+        # min-heap of (deadline, key); entries are checked lazily against _deadlines
+        self._expiry: List[Tuple[float, Tuple[str, int]]] = []
+        # immutable (deadline, peer) view republished by the receiver (the only writer);
+        # readers skip the lock
+        self._peers_snapshot: Tuple[Tuple[float, Dict], ...] = ()
+        # snapshot order; only re-sorted when a peer appears, leaves or is renamed
+        self._sorted_keys: List[Tuple[str, int]] = []
+        self._sorted_dirty = False
+        # raw beacon bytes -> parsed (name, port); beacons repeat verbatim every interval
+        self._last_beacon: Dict[bytes, Tuple[str, int]] = {}
 
         self._th_bcast = threading.Thread(target=self._broadcaster, daemon=True)
         self._th_recv = threading.Thread(target=self._receiver, daemon=True)
@@ -42,22 +60,23 @@ class Presence:
 
     def stop(self) -> None:
         self._running.clear()
+        self._wake.set()
 
     # ---- internals ----
     def _broadcaster(self) -> None:
         """Send presence beacons to the local subnet."""
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.setblocking(False)
 
-        payload = {"name": self.name, "port": self.tcp_port}
         while self._running.is_set():
             try:
-                msg = json.dumps(payload).encode("utf-8")
-                sock.sendto(msg, ("255.255.255.255", BCAST_PORT))
+                sock.sendto(self._beacon_bytes, ("255.255.255.255", BCAST_PORT))
             except Exception:
                 # Ignore transient network errors
                 pass
-            time.sleep(BCAST_INTERVAL)
+            if self._wake.wait(BCAST_INTERVAL):
+                break
 
     def _receiver(self) -> None:
         """Receive beacons, update the in-memory peer map."""
@@ -72,18 +91,36 @@ class Presence:
         sock.bind(("", BCAST_PORT))
         sock.settimeout(0.5)
 
-        while self._running.is_set():
+        # bound once: this loop runs per packet
+        is_running = self._running.is_set
+        recvfrom = sock.recvfrom
+        while is_running():
             try:
-                data, (ip, _port) = sock.recvfrom(2048)
+                data, (ip, _port) = recvfrom(2048)
             except socket.timeout:
+                with self._lock:
+                    if self._evict_expired(time.monotonic()):
+                        self._publish()
                 continue
             except Exception:
                 break
 
+            # cheap prefilter: beacons are JSON objects, drop other traffic before parsing
+            if len(data) < 2 or data[0] != 0x7B:
+                continue
+
             try:
-                info = json.loads(data.decode("utf-8", errors="replace"))
-                peer_name = (info.get("name") or "").strip() or "Unknown"
-                peer_port = int(info.get("port") or 0)
+                parsed = self._last_beacon.get(data)
+                if parsed is None:
+                    info = _loads(data)
+                    parsed = (
+                        (info.get("name") or "").strip() or "Unknown",
+                        int(info.get("port") or 0),
+                    )
+                    if len(self._last_beacon) >= BEACON_CACHE_MAX:
+                        self._last_beacon.clear()
+                    self._last_beacon[data] = parsed
+                peer_name, peer_port = parsed
                 if peer_port <= 0:
                     continue
                 # Ignore our own packets (same name + port)
@@ -91,26 +128,51 @@ class Presence:
                     continue
 
                 key = (ip, peer_port)
-                now = time.time()
+                now = time.monotonic()
                 with self._lock:
+                    prev = self._peers.get(key)
+                    if prev is None or prev["name"] != peer_name:
+                        self._sorted_dirty = True
                     self._peers[key] = {
                         "name": peer_name,
                         "ip": ip,
                         "port": peer_port,
-                        "last_seen": now,
+                        "last_seen": time.time(),  # wall clock, for display
                     }
+                    deadline = now + PEER_TTL
+                    self._deadlines[key] = deadline
+                    heapq.heappush(self._expiry, (deadline, key))
+                    self._evict_expired(now)
+                    self._publish()
             except Exception:
                 # Malformed JSON or other error — ignore
                 continue
 
+    def _evict_expired(self, now: float) -> bool:
+        """Drop peers whose TTL elapsed; caller holds the lock. Returns True if any were removed."""
+        removed = False
+        while self._expiry and self._expiry[0][0] < now:
+            deadline, k = heapq.heappop(self._expiry)
+            # stale heap entry if the peer was seen again since it was pushed
+            if self._deadlines.get(k) == deadline:
+                del self._deadlines[k]
+                del self._peers[k]
+                removed = True
+        if removed:
+            self._sorted_dirty = True
+        return removed
+
+    def _publish(self) -> None:
+        """Republish the sorted snapshot; caller holds the lock."""
+        if self._sorted_dirty:
+            peers = self._peers
+            self._sorted_keys = sorted(peers, key=lambda k: (peers[k]["name"].lower(), k[0], k[1]))
+            self._sorted_dirty = False
+        self._peers_snapshot = tuple((self._deadlines[k], self._peers[k]) for k in self._sorted_keys)
+
     # ---- API ----
     def get_active_peers(self) -> List[Dict]:
         """Return sorted list of peers filtered by TTL."""
-        now = time.time()
-        with self._lock:
-            expired = [k for k, v in self._peers.items() if now - v["last_seen"] > PEER_TTL]
-            for k in expired:
-                del self._peers[k]
-            items = list(self._peers.values())
-        items.sort(key=lambda x: (x["name"].lower(), x["ip"], x["port"]))
-        return items
+        now = time.monotonic()
+        # snapshot is already sorted by (name, ip, port)
+        return [p for deadline, p in self._peers_snapshot if deadline >= now]
@@ -3,33 +3,114 @@
 Enhanced relay server for global P2P discovery + message relay.
 Supports both HTTP API (discovery) and WebSocket (messaging).
 Deploy this to any hosting service (Heroku, Glitch, Railway, Render, etc.)
+In production run it under eventlet: gunicorn -k eventlet -w 1 relay_server:app
 """
 
-from flask import Flask, request, jsonify
+try:
+    # Green threads give every polling client and WebSocket its own cheap task
+    # instead of Werkzeug's dev server; must patch before anything imports socket.
+    import eventlet
+    eventlet.monkey_patch()
+    ASYNC_MODE = 'eventlet'
+except ImportError:
+    ASYNC_MODE = 'threading'
+
+from flask import Flask, request
 from flask_socketio import SocketIO, emit, join_room, leave_room
-import json
+import bisect
+import heapq
+import itertools
+import os
 import time
 import threading
-from typing import Dict
+from html import escape
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import orjson  # optional C encoder/decoder
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:  # fall back to the stdlib
+    import json
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+    _loads = json.loads
+
+# ENABLE_MESSAGING=0 runs discovery only: the message relay API and WebSocket events are off
+ENABLE_MESSAGING = os.environ.get('ENABLE_MESSAGING', '1') != '0'
+
+# With REDIS_URL set, queued messages live in Redis Streams (shared by all workers and
+# restarts) and WebSocket emits fan out across workers through Redis pub/sub.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    import redis
+    redis_client = redis.Redis.from_url(REDIS_URL)
+else:
+    redis_client = None
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'p2p-chat-secret-key'
-socketio = SocketIO(app, cors_allowed_origins="*", logger=False, engineio_logger=False)
+socketio = SocketIO(app, async_mode=ASYNC_MODE, cors_allowed_origins="*",
+                    message_queue=REDIS_URL, logger=False, engineio_logger=False)
 
 # In-memory storage (in production, use a database)
+# Peer records are never mutated in place, only replaced, so readers may share them
 peers: Dict[str, Dict] = {}
-messages: Dict[str, list] = {}  # user_id -> list of messages
-message_counter = 0
-lock = threading.Lock()
+# peer_id -> time.monotonic() deadline; last_seen in the record stays wall clock for clients
+peer_deadlines: Dict[str, float] = {}
+lock = threading.Lock()  # guards peers / peer_deadlines / expiry_heap only
+
+# Per-user message queues, sharded so unrelated users don't contend on one lock
+NSHARDS = 16
+MAX_QUEUED_MESSAGES = 100  # per user; older messages fall off the front
+msg_shards: List[Dict[str, 'MessageQueue']] = [{} for _ in range(NSHARDS)]  # user_id -> queue
+msg_locks = [threading.Lock() for _ in range(NSHARDS)]
+_message_ids = itertools.count(1)  # next() is atomic, no lock needed
 PEER_TTL = 30.0  # 30 seconds TTL
+MESSAGE_TTL = 24 * 3600.0  # queued messages older than this are dropped
+MAX_POLL_WAIT = 25.0  # cap on get_messages 'wait' (seconds a Redis-backed poll may block)
+SWEEP_INTERVAL = 5.0  # seconds between background cleanups
+# min-heap of (monotonic expires_at, peer_id); refreshed peers leave stale entries that are skipped lazily
+expiry_heap: List[Tuple[float, str]] = []
+# (built_at, [(peer_id, encoded peer record)]) for the whole peer set, shared by every
+# caller; 'exclude' is applied per request. Dropped when a peer joins, changes or leaves.
+# Heartbeats alone don't invalidate, so last_seen in a cached record may lag by up to
+# LIST_CACHE_MAX_AGE. Guarded by lock.
+LIST_CACHE_MAX_AGE = 1.0
+_list_cache: Optional[Tuple[float, List[Tuple[str, bytes]]]] = None
+# 'health' / 'index' -> prebuilt body; refreshed each sweep (so their clocks lag by up to
+# SWEEP_INTERVAL) and dropped on membership changes. Read without the lock.
+_status_pages: Dict[str, bytes] = {}
+
+# Constant response bodies, serialized once at import rather than per request
+_STATIC_BODIES = {
+    key: _dumps(payload) for key, payload in {
+        'updated': {'status': 'updated'},
+        'removed': {'status': 'removed'},
+        'no_json': {'error': 'No JSON data'},
+        'unknown_action': {'error': 'Unknown action'},
+        'missing_peer_id': {'error': 'Missing peer_id'},
+        'invalid_exclude': {'error': 'exclude must be a string'},
+        'missing_user_id': {'error': 'Missing user_id'},
+        'missing_message_fields': {'error': 'Missing sender, recipient, or text'},
+    }.items()
+}
+
+def _json_response(payload, status=200):
+    """Encode payload with _dumps into an application/json response."""
+    return app.response_class(_dumps(payload), status=status, mimetype='application/json')
+
+def _static_response(key, status=200):
+    return app.response_class(_STATIC_BODIES[key], status=status, mimetype='application/json')
 
 @app.route('/api', methods=['POST'])
 def api():
     """Handle peer discovery requests."""
     try:
-        data = request.get_json()
+        body = request.get_data()
+        data = _loads(body) if body else None
         if not data:
-            return jsonify({'error': 'No JSON data'}), 400
+            return _static_response('no_json', 400)
         
         action = data.get('action')
         
@@ -37,113 +118,247 @@ def api():
             return handle_update(data)
         elif action == 'list':
             return handle_list(data)
+        elif action == 'update_and_list':
+            return handle_update_and_list(data)
         elif action == 'remove':
             return handle_remove(data)
-        elif action == 'register_messaging':
+        elif ENABLE_MESSAGING and action == 'register_messaging':
             return handle_register_messaging(data)
-        elif action == 'send_message':
+        elif ENABLE_MESSAGING and action == 'send_message':
             return handle_send_message(data)
-        elif action == 'get_messages':
+        elif ENABLE_MESSAGING and action == 'get_messages':
             return handle_get_messages(data)
         else:
-            return jsonify({'error': 'Unknown action'}), 400
+            return _static_response('unknown_action', 400)
             
+    except ValueError:
+        return _static_response('no_json', 400)  # malformed body
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _json_response({'error': str(e)}, 500)
+
+def _shard(user_id) -> int:
+    """Index of the message shard (and lock) owning user_id."""
+    return hash(user_id) % NSHARDS
+
+class MessageQueue:
+    """
+    Bounded per-user message queue with a parallel, sorted list of ids so
+    since_id lookups are a bisect instead of a scan. Dropped messages are
+    skipped via a head offset and compacted in bulk. Callers hold the shard lock.
+    """
+    __slots__ = ('ids', 'items', 'head')
+    
+    def __init__(self):
+        self.ids: List[int] = []
+        self.items: List[Dict] = []
+        self.head = 0  # index of the oldest live message
+    
+    def __len__(self):
+        return len(self.items) - self.head
+    
+    def __iter__(self):
+        return iter(self.items[self.head:])
+    
+    def push(self, msg: Dict) -> int:
+        """Append msg with the next global id (monotonic within this queue); returns the id."""
+        msg['id'] = msg_id = next(_message_ids)
+        self.ids.append(msg_id)
+        self.items.append(msg)
+        if len(self) > MAX_QUEUED_MESSAGES:
+            self._advance(self.head + 1)
+        return msg_id
+    
+    def since(self, since_id) -> List[Dict]:
+        """Messages with id > since_id, oldest first."""
+        i = bisect.bisect_right(self.ids, since_id, self.head)
+        return self.items[i:]
+    
+    def drop_older_than(self, cutoff: float):
+        """Drop messages timestamped before cutoff (timestamps increase with ids)."""
+        head = self.head
+        while head < len(self.items) and self.items[head].get('timestamp', cutoff) < cutoff:
+            head += 1
+        self._advance(head)
+    
+    def _advance(self, head: int):
+        self.head = head
+        if head >= MAX_QUEUED_MESSAGES:
+            del self.ids[:head]
+            del self.items[:head]
+            self.head = 0
+
+def _user_queue(messages, user_id) -> MessageQueue:
+    """Get (creating if needed) a user's message queue; caller holds the shard lock."""
+    queue = messages.get(user_id)
+    if queue is None:
+        queue = messages[user_id] = MessageQueue()
+    return queue
+
+def _stream_key(user_id) -> str:
+    return f'msg:{user_id}'
+
+def _stream_messages(entries) -> List[Dict]:
+    """Decode XREAD/XRANGE entries, using the stream entry id as the message id."""
+    messages = []
+    for entry_id, fields in entries:
+        msg = _loads(fields[b'data'])
+        msg['id'] = entry_id.decode()
+        messages.append(msg)
+    return messages
+
+def _enqueue_message(recipient, msg: Dict):
+    """Queue msg for recipient (in Redis or the sharded queues); returns its id."""
+    if redis_client is not None:
+        key = _stream_key(recipient)
+        pipe = redis_client.pipeline()
+        pipe.xadd(key, {'data': _dumps(msg)}, maxlen=MAX_QUEUED_MESSAGES, approximate=True)
+        pipe.expire(key, int(MESSAGE_TTL))  # idle streams go away like swept queues
+        entry_id = pipe.execute()[0].decode()
+        msg['id'] = entry_id
+        return entry_id
+    i = _shard(recipient)
+    with msg_locks[i]:
+        # Add message to recipient's queue; it keeps only the last 100
+        return _user_queue(msg_shards[i], recipient).push(msg)
+
+def _messages_since(user_id, since_id, wait=0.0) -> List[Dict]:
+    """
+    Messages for user_id newer than since_id, oldest first. With Redis, an empty
+    result blocks for up to wait seconds until something arrives.
+    """
+    if redis_client is not None:
+        block = int(min(max(wait, 0.0), MAX_POLL_WAIT) * 1000) or None
+        result = redis_client.xread({_stream_key(user_id): since_id or '0'},
+                                    count=MAX_QUEUED_MESSAGES, block=block)
+        return _stream_messages(result[0][1]) if result else []
+    i = _shard(user_id)
+    with msg_locks[i]:
+        return _user_queue(msg_shards[i], user_id).since(since_id)
+
+def _take_queued(user_id) -> List[Dict]:
+    """Remove and return everything queued for user_id."""
+    if redis_client is not None:
+        key = _stream_key(user_id)
+        pipe = redis_client.pipeline()  # MULTI/EXEC: nothing lands between read and delete
+        pipe.xrange(key)
+        pipe.delete(key)
+        return _stream_messages(pipe.execute()[0])
+    i = _shard(user_id)
+    with msg_locks[i]:
+        queue = msg_shards[i].pop(user_id, None)
+    return list(queue) if queue else []
 
 def handle_update(data):
     """Handle peer presence update."""
     peer_id = data.get('peer_id')
     if not peer_id:
-        return jsonify({'error': 'Missing peer_id'}), 400
+        return _static_response('missing_peer_id', 400)
+    
+    _record_peer(peer_id, data)
     
+    return _static_response('updated')
+
+def _peers_changed():
+    """Invalidate views derived from the peer set; caller holds lock."""
+    global _list_cache
+    _list_cache = None
+    _status_pages.clear()
+
+def _record_peer(peer_id, data):
+    """Store/refresh a peer (as a fresh record) and schedule its expiry."""
+    now = time.time()
+    deadline = time.monotonic() + PEER_TTL
+    name = data.get('name', 'Unknown')
+    public_ip = data.get('public_ip')
+    tcp_port = data.get('tcp_port')
     with lock:
+        prev = peers.get(peer_id)
+        if prev is None or (prev['name'], prev['public_ip'], prev['tcp_port']) != (name, public_ip, tcp_port):
+            _peers_changed()
         peers[peer_id] = {
             'peer_id': peer_id,
-            'name': data.get('name', 'Unknown'),
-            'public_ip': data.get('public_ip'),
-            'tcp_port': data.get('tcp_port'),
-            'last_seen': time.time()
+            'name': name,
+            'public_ip': public_ip,
+            'tcp_port': tcp_port,
+            'last_seen': now
         }
-    
-    return jsonify({'status': 'updated'})
+        peer_deadlines[peer_id] = deadline
+        heapq.heappush(expiry_heap, (deadline, peer_id))
 
 def handle_list(data):
     """Handle peer list request."""
+    global _list_cache
     exclude = data.get('exclude')
+    if exclude is not None and not isinstance(exclude, str):
+        return _static_response('invalid_exclude', 400)
+    
+    now = time.monotonic()
     
     with lock:
-        now = time.time()
-        # Clean expired peers
-        expired = [peer_id for peer_id, peer_info in peers.items()
-                  if now - peer_info.get('last_seen', 0) > PEER_TTL]
-        for peer_id in expired:
-            del peers[peer_id]
-        
-        # Get active peers
-        active_peers = []
-        for peer_id, peer_info in peers.items():
-            if peer_id != exclude:
-                active_peers.append(peer_info.copy())
+        if _list_cache is None or now - _list_cache[0] > LIST_CACHE_MAX_AGE:
+            _list_cache = (now, [(peer_id, _dumps(peer_info)) for peer_id, peer_info in peers.items()])
+        # Expiry is handled by the sweeper; just skip peers that lapsed since its last pass
+        records = [record for peer_id, record in _list_cache[1]
+                   if peer_id != exclude and peer_deadlines.get(peer_id, 0) >= now]
     
-    return jsonify({'peers': active_peers})
+    body = b'{"peers":[' + b','.join(records) + b']}'
+    return app.response_class(body, mimetype='application/json')
+
+def handle_update_and_list(data):
+    """Handle a combined presence update + peer list request (one round-trip per cycle)."""
+    peer_id = data.get('peer_id')
+    if not peer_id:
+        return _static_response('missing_peer_id', 400)
+    
+    _record_peer(peer_id, data)
+    
+    return handle_list(data)
 
 def handle_remove(data):
     """Handle peer removal."""
     peer_id = data.get('peer_id')
     if peer_id:
         with lock:
-            peers.pop(peer_id, None)
+            if peers.pop(peer_id, None) is not None:
+                del peer_deadlines[peer_id]
+                _peers_changed()
     
-    return jsonify({'status': 'removed'})
+    return _static_response('removed')
 
 def handle_register_messaging(data):
     """Register user for message relay"""
     user_id = data.get('user_id')
     if not user_id:
-        return jsonify({'error': 'Missing user_id'}), 400
+        return _static_response('missing_user_id', 400)
     
-    with lock:
-        if user_id not in messages:
-            messages[user_id] = []
+    if redis_client is None:  # streams are created by the first XADD
+        i = _shard(user_id)
+        with msg_locks[i]:
+            _user_queue(msg_shards[i], user_id)
     
-    return jsonify({
+    return _json_response({
         'status': 'ok',
         'message': f'Registered for messaging: {user_id}'
     })
 
 def handle_send_message(data):
     """Send message to another user"""
-    global message_counter
-    
     sender = data.get('sender')
     recipient = data.get('recipient')  
     text = data.get('text')
     
     if not all([sender, recipient, text]):
-        return jsonify({'error': 'Missing sender, recipient, or text'}), 400
+        return _static_response('missing_message_fields', 400)
     
-    with lock:
-        message_counter += 1
-        
-        # Add message to recipient's queue
-        if recipient not in messages:
-            messages[recipient] = []
-        
-        messages[recipient].append({
-            'id': message_counter,
-            'sender': sender,
-            'text': text,
-            'timestamp': time.time()
-        })
-        
-        # Keep only last 100 messages per user
-        if len(messages[recipient]) > 100:
-            messages[recipient] = messages[recipient][-100:]
+    message_id = _enqueue_message(recipient, {
+        'sender': sender,
+        'text': text,
+        'timestamp': time.time()
+    })
     
-    return jsonify({
+    return _json_response({
         'status': 'ok',
-        'message_id': message_counter
+        'message_id': message_id
     })
 
 def handle_get_messages(data):
@@ -152,57 +367,141 @@ def handle_get_messages(data):
     since_id = data.get('since_id', 0)
     
     if not user_id:
-        return jsonify({'error': 'Missing user_id'}), 400
+        return _static_response('missing_user_id', 400)
     
-    with lock:
-        if user_id not in messages:
-            messages[user_id] = []
-        
-        # Get messages newer than since_id
-        new_messages = [msg for msg in messages[user_id] if msg['id'] > since_id]
+    # Get messages newer than since_id
+    new_messages = _messages_since(user_id, since_id, data.get('wait', 0.0))
     
-    return jsonify({
+    return _json_response({
         'status': 'ok',
         'messages': new_messages,
         'count': len(new_messages)
     })
 
-@app.route('/health', methods=['GET'])
-def health():
-    """Health check endpoint."""
+def _sweep_once():
+    """Purge expired peers and stale queued messages."""
+    now = time.monotonic()
     with lock:
-        return jsonify({
-            'status': 'ok', 
-            'peers': len(peers),
-            'timestamp': time.time()
-        })
+        # O(k log N) for k due heap entries
+        while expiry_heap and expiry_heap[0][0] <= now:
+            _, peer_id = heapq.heappop(expiry_heap)
+            deadline = peer_deadlines.get(peer_id)
+            if deadline is not None and deadline <= now:
+                del peers[peer_id]
+                del peer_deadlines[peer_id]
+                _peers_changed()
+        _build_status_pages()
+    
+    # Bound message memory: drop old messages and empty queues, one shard at a time.
+    # Message timestamps are sent to clients, so they stay on the wall clock.
+    wall_now = time.time()
+    for messages, shard_lock in zip(msg_shards, msg_locks):
+        with shard_lock:
+            for user_id in list(messages):
+                queue = messages[user_id]
+                queue.drop_older_than(wall_now - MESSAGE_TTL)
+                if not queue:
+                    del messages[user_id]
 
-@app.route('/', methods=['GET'])
-def index():
-    """Simple status page."""
-    with lock:
-        return f"""
+def _sweeper():
+    """Background cleanup loop so request handlers never pay for expiry."""
+    while True:
+        time.sleep(SWEEP_INTERVAL)
+        try:
+            _sweep_once()
+        except Exception as e:
+            print(f"Sweeper error: {e}")
+
+threading.Thread(target=_sweeper, daemon=True).start()
+
+def _build_status_pages():
+    """Render the /health and / bodies from the current peer set; caller holds lock."""
+    _status_pages['health'] = _dumps({
+        'status': 'ok', 
+        'peers': len(peers),
+        'timestamp': time.time()
+    })
+    _status_pages['index'] = f"""
         <h1>P2P Relay Server</h1>
         <p>Status: Running</p>
         <p>Active Peers: {len(peers)}</p>
         <p>Time: {time.strftime('%Y-%m-%d %H:%M:%S')}</p>
         <h3>Active Peers:</h3>
         <ul>
-        {''.join(f'<li>{peer["name"]} ({peer["public_ip"]}:{peer["tcp_port"]})</li>' 
+        {''.join(f'<li>{escape(str(peer["name"]))} ({escape(str(peer["public_ip"]))}:{escape(str(peer["tcp_port"]))})</li>' 
                 for peer in peers.values())}
         </ul>
-        """
+        """.encode('utf-8')
+
+def _status_page(key) -> bytes:
+    body = _status_pages.get(key)
+    if body is None:
+        with lock:
+            _build_status_pages()
+            body = _status_pages[key]
+    return body
+
+@app.route('/health', methods=['GET'])
+def health():
+    """Health check endpoint."""
+    return app.response_class(_status_page('health'), mimetype='application/json')
+
+@app.route('/', methods=['GET'])
+def index():
+    """Simple status page."""
+    return app.response_class(_status_page('index'), mimetype='text/html')
 
 # WebSocket Message Relay (real-time messaging)
 connected_users = {}  # session_id -> user_info
 
-@socketio.on('connect')
+# Outbound batching: messages for one recipient arriving within EMIT_BATCH_WINDOW go out
+# as a single 'messages' event (a lone message is still sent as 'message')
+EMIT_BATCH_WINDOW = 0.005  # seconds
+EMIT_BATCH_MAX_BYTES = 64 * 1024  # flush early so one frame can't grow unbounded
+_pending_emits: Dict[str, list] = {}  # recipient_id -> messages waiting to be flushed
+_pending_bytes: Dict[str, int] = {}
+_pending_lock = threading.Lock()
+
+def _emit_batch(recipient_id, batch):
+    if len(batch) == 1:
+        socketio.emit('message', batch[0], room=recipient_id)
+    else:
+        socketio.emit('messages', batch, room=recipient_id)
+
+def _take_pending(recipient_id):
+    """Detach a recipient's pending batch; caller holds _pending_lock."""
+    _pending_bytes.pop(recipient_id, None)
+    return _pending_emits.pop(recipient_id, None)
+
+def _flush_later(recipient_id):
+    socketio.sleep(EMIT_BATCH_WINDOW)
+    with _pending_lock:
+        batch = _take_pending(recipient_id)
+    if batch:
+        _emit_batch(recipient_id, batch)
+
+def _queue_emit(recipient_id, message_obj):
+    """Queue a message for recipient_id, scheduling a flush if none is pending."""
+    size = len(message_obj.get('text') or '')
+    with _pending_lock:
+        batch = _pending_emits.get(recipient_id)
+        if batch is None:
+            _pending_emits[recipient_id] = [message_obj]
+            _pending_bytes[recipient_id] = size
+            socketio.start_background_task(_flush_later, recipient_id)
+            return
+        batch.append(message_obj)
+        _pending_bytes[recipient_id] += size
+        if _pending_bytes[recipient_id] < EMIT_BATCH_MAX_BYTES:
+            return
+        batch = _take_pending(recipient_id)
+    _emit_batch(recipient_id, batch)
+
 def handle_connect():
     """Handle WebSocket connection"""
     print(f"WebSocket client connected: {request.sid}")
     emit('status', {'message': 'Connected to message relay'})
 
-@socketio.on('disconnect')  
 def handle_disconnect():
     """Handle WebSocket disconnection"""
     if request.sid in connected_users:
@@ -211,7 +510,6 @@ def handle_disconnect():
         del connected_users[request.sid]
         print(f"User {user_id} disconnected from message relay")
 
-@socketio.on('register')
 def handle_register(data):
     """Register user for message relay and deliver queued messages"""
     user_id = data.get('user_id')
@@ -224,26 +522,22 @@ def handle_register(data):
         emit('registered', {'user_id': user_id})
         print(f"User {user_id} registered for message relay")
         
-        # Deliver any queued messages
-        with lock:
-            if user_id in messages and messages[user_id]:
-                queued_messages = messages[user_id].copy()
-                messages[user_id] = []  # Clear queue
+        # Deliver any queued messages (detached from the queue first, emitted outside any lock)
+        queued_messages = _take_queued(user_id)
+        if queued_messages:
+            print(f"📬 Delivering {len(queued_messages)} queued messages to {user_id}")
+            for msg in queued_messages:
+                emit('message', msg)
+                # Notify original sender that queued message was delivered
+                socketio.emit('delivered', {
+                    'recipient': user_id,
+                    'message_id': msg.get('message_id', 'unknown'),
+                    'actual_delivery': True,
+                    'was_queued': True
+                }, room=msg['sender'])
                 
-                print(f"📬 Delivering {len(queued_messages)} queued messages to {user_id}")
-                for msg in queued_messages:
-                    emit('message', msg)
-                    # Notify original sender that queued message was delivered
-                    socketio.emit('delivered', {
-                        'recipient': user_id,
-                        'message_id': msg.get('message_id', 'unknown'),
-                        'actual_delivery': True,
-                        'was_queued': True
-                    }, room=msg['sender'])
-                
-                print(f"✅ All queued messages delivered to {user_id}")
+            print(f"✅ All queued messages delivered to {user_id}")
 
-@socketio.on('send_message')
 def handle_ws_message(data):
     """Handle WebSocket message sending with proper offline queuing"""
     if request.sid not in connected_users:
@@ -271,8 +565,8 @@ def handle_ws_message(data):
         }
         
         if recipient_online:
-            # Recipient is online - deliver immediately
-            socketio.emit('message', message_obj, room=recipient_id)
+            # Recipient is online - deliver with the next batch flush (within a few ms)
+            _queue_emit(recipient_id, message_obj)
             emit('delivered', {
                 'recipient': recipient_id, 
                 'message_id': message_id,
@@ -281,10 +575,7 @@ def handle_ws_message(data):
             print(f"✅ Delivered message from {sender_id} to {recipient_id} (online)")
         else:
             # Recipient is offline - queue message
-            with lock:
-                if recipient_id not in messages:
-                    messages[recipient_id] = []
-                messages[recipient_id].append(message_obj)
+            _enqueue_message(recipient_id, message_obj)
             
             emit('message_queued', {
                 'recipient': recipient_id,
@@ -294,25 +585,33 @@ def handle_ws_message(data):
     else:
         emit('error', {'message': 'Missing recipient or text'})
 
-@socketio.on('ping')
 def handle_ping():
     """Handle ping for keepalive"""
     emit('pong')
 
+if ENABLE_MESSAGING:
+    socketio.on_event('connect', handle_connect)
+    socketio.on_event('disconnect', handle_disconnect)
+    socketio.on_event('register', handle_register)
+    socketio.on_event('send_message', handle_ws_message)
+    socketio.on_event('ping', handle_ping)
+
 if __name__ == '__main__':
     print("Starting Enhanced P2P Relay Server...")
     print("- HTTP API for peer discovery")  
-    print("- HTTP API for message relay (polling)")
-    print("- WebSocket for real-time messaging")
+    if ENABLE_MESSAGING:
+        print("- HTTP API for message relay (polling)")
+        print("- WebSocket for real-time messaging")
     print("Deploy this to Render for global access")
     
     # Production deployment for Render
-    import os
     port = int(os.environ.get('PORT', 5000))
     
-    # Use socketio.run with production settings for Render
+    # Prefer gunicorn (see render.yaml); this path serves with eventlet when installed
+    # and only falls back to Werkzeug without it
+    run_kwargs = {} if ASYNC_MODE == 'eventlet' else {'allow_unsafe_werkzeug': True}
     socketio.run(app, 
                 host='0.0.0.0', 
                 port=port, 
                 debug=False,
-                allow_unsafe_werkzeug=True)  # Required for Render deployment
+                **run_kwargs)
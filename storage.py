@@ -1,22 +1,35 @@
 # storage.py
-import json
+import atexit
+import hashlib
 import os
 import threading
 import time
+from collections import deque
 from pathlib import Path
+from typing import Callable
+
+from net._json import dumps as _dumps, loads as _loads
 
 def _now_ts() -> float:
     return time.time()
 
+SAVE_DELAY = 0.5  # seconds; writes within this window share one save
+MESSAGE_TAIL = 500  # recent messages per peer kept in memory for get_messages
+
 def _peer_key(name: str, ip: str, port: int) -> str:
     return f"{name}@{ip}:{port}"
 
 class Storage:
     """
     Very small local JSON storage for:
-      - friends (people you've chatted with)
-      - messages (per peer)
-    File lives in: ~/.p2p_desktop_app/state.json
+      - friends (people you've chatted with), in ~/.p2p_desktop_app/state.json
+      - messages, one append-only JSON-lines log per peer in
+        ~/.p2p_desktop_app/messages/<sha1 of peer_key>.jsonl, whose first line
+        records the peer_key
+    Friend writes are coalesced: mutations mark the state dirty and a background
+    timer saves it SAVE_DELAY later (and once more at interpreter exit).
+    Messages are appended as they arrive, so a send never rewrites history.
+    Both files are machine-generated compact JSON (UTF-8), not meant for hand editing.
     """
     def __init__(self, path: str | None = None):
         if path is None:
@@ -25,18 +38,33 @@ class Storage:
             path = str(base / "state.json")
         self.path = path
         self._lock = threading.Lock()
-        self._data = {"friends": {}, "messages": {}}  # keys are peer_key
+        self._save_lock = threading.Lock()  # serializes file writes
+        self._generation = 0  # bumped per state snapshot (under _lock)
+        self._saved_generation = 0  # newest snapshot on disk (under _save_lock)
+        self._data = {"friends": {}}  # keys are peer_key
+        self._dirty = False
+        self._flush_timer: threading.Timer | None = None
+        self._msg_dir = Path(path).parent / "messages"
+        self._msg_dir.mkdir(parents=True, exist_ok=True)
+        self._fds: dict = {}  # peer_key -> open append handle
+        self._tails: dict[str, deque] = {}  # peer_key -> recent messages, loaded lazily
+        self._friends_sorted: list[dict] | None = None  # get_friends() result until friends change
+        self._listeners: list[Callable[[], None]] = []
 
         self._load()
+        atexit.register(self.flush)
 
     # ---------- low-level ----------
     def _load(self):
         try:
-            with open(self.path, "r", encoding="utf-8") as f:
-                self._data = json.load(f)
+            with open(self.path, "rb") as f:
+                self._data = _loads(f.read())
             # sanity
             self._data.setdefault("friends", {})
-            self._data.setdefault("messages", {})
+            legacy = self._data.pop("messages", None)
+            if legacy:
+                self._migrate_messages(legacy)
+                self._save()
         except FileNotFoundError:
             self._save()
         except Exception:
@@ -46,14 +74,86 @@ class Storage:
                 os.replace(self.path, bak)
             except Exception:
                 pass
-            self._data = {"friends": {}, "messages": {}}
+            self._data = {"friends": {}}
             self._save()
 
+    def _migrate_messages(self, legacy: dict):
+        """Move histories from the old all-in-one state.json into per-peer logs."""
+        for peer_key, items in legacy.items():
+            with self._open_log(peer_key) as f:
+                f.writelines(_dumps(item) + b"\n" for item in items)
+
+    def _log_path(self, peer_key: str) -> Path:
+        # a fixed-length name: peer keys can be too long for a filename or differ only in case
+        return self._msg_dir / (hashlib.sha1(peer_key.encode("utf-8")).hexdigest() + ".jsonl")
+
+    def _open_log(self, peer_key: str):
+        """Open a peer's log for appending, starting a new one with a peer_key header."""
+        f = open(self._log_path(peer_key), "ab")
+        if f.tell() == 0:
+            f.write(_dumps({"peer_key": peer_key}) + b"\n")
+        return f
+
+    def _read_log(self, peer_key: str, maxlen: int | None = None) -> deque:
+        """Parse a peer's log (skipping a torn last line), keeping the last maxlen items."""
+        items = deque(maxlen=maxlen)
+        try:
+            with open(self._log_path(peer_key), "rb") as f:
+                for line in f:
+                    try:
+                        item = _loads(line)
+                    except ValueError:
+                        continue
+                    if "role" in item:  # not the header
+                        items.append(item)
+        except OSError:
+            pass  # no log yet, or unreadable: no history
+        return items
+
+    def _tail(self, peer_key: str) -> deque:
+        """In-memory tail of a peer's history; caller holds self._lock."""
+        tail = self._tails.get(peer_key)
+        if tail is None:
+            tail = self._tails[peer_key] = self._read_log(peer_key, MESSAGE_TAIL)
+        return tail
+
     def _save(self):
-        tmp = self.path + ".tmp"
-        with open(tmp, "w", encoding="utf-8") as f:
-            json.dump(self._data, f, ensure_ascii=False, indent=2)
-        os.replace(tmp, self.path)
+        self._generation += 1
+        self._write(_dumps(self._data), self._generation)
+
+    def _write(self, body: bytes, generation: int):
+        """Write a state snapshot, unless a newer one has already been written."""
+        with self._save_lock:
+            if generation <= self._saved_generation:
+                return  # a slower, older flush finishing late
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, self.path)
+            self._saved_generation = generation
+
+    def _mark_dirty(self):
+        """Flag unsaved changes and schedule a flush; caller holds self._lock."""
+        self._dirty = True
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(SAVE_DELAY, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """Write pending changes to disk now (no-op if nothing changed)."""
+        with self._lock:
+            timer, self._flush_timer = self._flush_timer, None
+            if not self._dirty:
+                return
+            self._dirty = False
+            # serialize under the lock (a consistent snapshot), write outside it
+            body = _dumps(self._data)
+            self._generation += 1
+            generation = self._generation
+        if timer is not None:
+            timer.cancel()
+        self._write(body, generation)
 
     # ---------- friends ----------
     def upsert_friend(self, name: str, ip: str, port: int):
@@ -68,17 +168,48 @@ class Storage:
                 "port": int(port),
                 "last_spoke": _now_ts(),
             }
-            self._save()
+            self._friends_sorted = None
+            self._mark_dirty()
+        self._notify_change()
         return key
 
+    def remove_friend(self, key: str) -> bool:
+        """
+        Forget a friend (their message log is kept). Returns False if unknown.
+        """
+        with self._lock:
+            if self._data["friends"].pop(key, None) is None:
+                return False
+            self._friends_sorted = None
+            self._mark_dirty()
+        self._notify_change()
+        return True
+
     def get_friends(self) -> list[dict]:
         """
         Returns a list of friend dicts sorted by last_spoke desc.
+        The sorted list is cached until the friends change.
         """
         with self._lock:
-            friends = list(self._data["friends"].values())
-        friends.sort(key=lambda x: x.get("last_spoke", 0), reverse=True)
-        return friends
+            if self._friends_sorted is None:
+                friends = list(self._data["friends"].values())
+                friends.sort(key=lambda x: x.get("last_spoke", 0), reverse=True)
+                self._friends_sorted = friends
+            return list(self._friends_sorted)
+
+    def add_change_listener(self, callback: Callable[[], None]):
+        """
+        Call callback (on the mutating thread, without the lock held) whenever
+        the friends list changes, so callers needn't poll get_friends().
+        """
+        self._listeners.append(callback)
+
+    def _notify_change(self):
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception:
+                pass  # a broken listener must not fail the write
 
     # ---------- messages ----------
     def add_message(self, peer_key: str, role: str, text: str, ts: float | None = None):
@@ -89,14 +220,21 @@ class Storage:
         if ts is None:
             ts = _now_ts()
         item = {"role": role, "text": text, "ts": ts}
+        line = _dumps(item) + b"\n"
         with self._lock:
-            self._data["messages"].setdefault(peer_key, [])
-            self._data["messages"][peer_key].append(item)
-            self._save()
+            self._tail(peer_key).append(item)
+            f = self._fds.get(peer_key)
+            if f is None:
+                f = self._fds[peer_key] = self._open_log(peer_key)
+            f.write(line)
+            f.flush()  # hand it to the OS so a crash of this process doesn't lose it
 
     def get_messages(self, peer_key: str, limit: int = 200) -> list[dict]:
         with self._lock:
-            msgs = list(self._data["messages"].get(peer_key, []))
+            if limit and limit <= MESSAGE_TAIL:
+                msgs = list(self._tail(peer_key))
+            else:
+                msgs = list(self._read_log(peer_key))
         if limit and len(msgs) > limit:
             return msgs[-limit:]
         return msgs
@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 import tkinter as tk
+from collections import deque
+from tkinter import font as tkfont
 from tkinter import ttk
-from typing import Optional, Tuple
+from typing import Deque, List, Optional, Tuple
 
 from net.peer_conn import PeerConn
 from storage import Storage
 
+MAX_RENDERED_ROWS = 200  # message rows kept on screen; older rows are recycled for new ones
+EARLIER_CHUNK = 50  # recycled messages brought back per "load earlier"
+HISTORY_CHUNK = 10  # history bubbles rendered per event-loop turn while a chat opens
+
 
 class ChatWindow(tk.Toplevel):
     """
@@ -51,6 +57,16 @@ class ChatWindow(tk.Toplevel):
             'gradient_end': '#F7FAFC'    # Gradient end
         }
 
+        # Named Tk fonts resolved once and shared by every widget (bubbles reuse them per message)
+        self.fonts = {
+            'title': tkfont.Font(self, family="Segoe UI", size=18, weight="bold"),
+            'status': tkfont.Font(self, family="Segoe UI", size=12),
+            'entry': tkfont.Font(self, family="Segoe UI", size=13),
+            'send': tkfont.Font(self, family="Segoe UI", size=16, weight="bold"),
+            'bubble': tkfont.Font(self, family="Segoe UI", size=11),
+            'banner': tkfont.Font(self, family="Segoe UI", size=9, weight="bold"),
+        }
+
         self.storage = storage or Storage()
         self.peer_name = peer_name or "Peer"
         self.peer_ip: Optional[str] = None
@@ -80,7 +96,7 @@ class ChatWindow(tk.Toplevel):
         
         initial = self.peer_name[0].upper() if self.peer_name else "?"
         avatar_label = tk.Label(avatar_frame, text=initial, 
-                               font=("Segoe UI", 18, "bold"),
+                               font=self.fonts['title'],
                                bg=self.colors['secondary'], fg=self.colors['text_primary'])
         avatar_label.pack(expand=True)
         
@@ -89,13 +105,13 @@ class ChatWindow(tk.Toplevel):
         contact_info.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=18)
         
         name_label = tk.Label(contact_info, text=self.peer_name, 
-                             font=("Segoe UI", 18, "bold"),
+                             font=self.fonts['title'],
                              bg=self.colors['primary'], fg=self.colors['text_primary'])
         name_label.pack(anchor="w", pady=(0, 2))
         
         self.status_var = tk.StringVar(value="connecting…")
         status_label = tk.Label(contact_info, textvariable=self.status_var, 
-                               font=("Segoe UI", 12),
+                               font=self.fonts['status'],
                                bg=self.colors['primary'], fg=self.colors['text_secondary'])
         status_label.pack(anchor="w")
 
@@ -112,9 +128,27 @@ class ChatWindow(tk.Toplevel):
         vs.pack(side=tk.RIGHT, fill=tk.Y)
 
         self.msg_frame = tk.Frame(self.canvas, bg=self.colors['chat_bg'])
+        # (row, label, (text, side)) oldest first; side is "left"/"right" or "system"/"error"
+        self._rows: Deque[Tuple[tk.Frame, tk.Label, Tuple[str, str]]] = deque()
+        self._row_limit = MAX_RENDERED_ROWS  # grows when the user loads earlier messages
+        self._evicted: Deque[Tuple[str, str]] = deque()  # (text, side) of recycled rows, oldest first
+        self._earlier_btn = tk.Button(self.msg_frame, text="⬆ Load earlier messages",
+                                      command=self._load_earlier, font=self.fonts['banner'],
+                                      bg=self.colors['border'], fg=self.colors['text_secondary'],
+                                      activebackground=self.colors['hover'],
+                                      relief="flat", bd=0, padx=12, pady=4, cursor="hand2")
+        self._keep_view = False  # next layout leaves the view where it is instead of scrolling down
+        # (text, side) bubbles still to render while history loads; live ones queue behind it
+        self._backlog: Deque[Tuple[str, str]] = deque()
+        self._layout_pending = False  # a scrollregion update is scheduled for the next idle
+        self._content_size = (0, 0)  # msg_frame's size from its last <Configure>
         self.canvas_win = self.canvas.create_window((0, 0), window=self.msg_frame, anchor="nw")
         self.msg_frame.bind("<Configure>", self._on_frame_configure)
         self.canvas.bind("<Configure>", self._on_canvas_configure)
+        # Every widget in this window carries the toplevel's bindtag, so one binding here
+        # scrolls the chat wherever the pointer is, with no per-bubble bindings
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.bind(seq, self._on_mousewheel)
 
         # ---- Beautiful Pastel Input Area ----
         input_container = tk.Frame(self, bg=self.colors['surface'], height=85)
@@ -129,7 +163,7 @@ class ChatWindow(tk.Toplevel):
             input_frame, textvariable=self.msg_var, relief="flat",
             bg=self.colors['background'], fg=self.colors['text_primary'], 
             insertbackground=self.colors['text_primary'],
-            font=("Segoe UI", 13), bd=2, highlightthickness=2,
+            font=self.fonts['entry'], bd=2, highlightthickness=2,
             highlightcolor=self.colors['accent'], highlightbackground=self.colors['border']
         )
         self.entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 12), ipady=14)
@@ -138,7 +172,7 @@ class ChatWindow(tk.Toplevel):
         self.entry.bind("<Return>", self.on_send)
 
         send_btn = tk.Button(
-            input_frame, text="➤", font=("Segoe UI", 16, "bold"),
+            input_frame, text="➤", font=self.fonts['send'],
             bg=self.colors['secondary'], fg=self.colors['text_primary'], 
             activebackground=self.colors['primary_dark'],
             activeforeground=self.colors['text_primary'], 
@@ -149,20 +183,32 @@ class ChatWindow(tk.Toplevel):
 
 
         # ---- Networking ----
-        self.conn = PeerConn(self._ingest_line)
-        self.after(80, self._poll_recv)
+        # The I/O thread posts <<PeerData>> when lines arrive; no timer polling while idle
+        self.conn = PeerConn(self._ingest_lines, notify=self._notify_recv)
+        self.bind("<<PeerData>>", self._on_peer_data)
 
         if adopt:
-            sock, addr = adopt
             # record peer ip/port from incoming
-            self.peer_ip, self.peer_port = addr[0], addr[1]
+            self.peer_ip, self.peer_port = adopt[1][0], adopt[1][1]
+        elif connect_to:
+            self.peer_ip, self.peer_port = connect_to
+        if self.peer_ip:
             self.peer_name = self.peer_name or f"{self.peer_ip}"
             self.friend_key = self.storage.upsert_friend(self.peer_name, self.peer_ip, self.peer_port)
+            # Queue recent history before connecting, so banners and live lines land below it;
+            # it renders a chunk at a time so the window paints right away
+            self._backlog.extend(
+                (rec["text"], "right" if rec["role"] == "out" else "left")
+                for rec in self.storage.get_messages(self.friend_key, limit=100)
+            )
+            if self._backlog:
+                self.after_idle(self._load_history_chunk)
+
+        if adopt:
+            sock, addr = adopt
             self.conn.adopt(sock, addr)
             self.status_var.set("🟢 Online")
         elif connect_to:
-            self.peer_ip, self.peer_port = connect_to
-            self.friend_key = self.storage.upsert_friend(self.peer_name or self.peer_ip, self.peer_ip, self.peer_port)
             ok = self.conn.connect(self.peer_ip, self.peer_port)
             self.status_var.set("🟢 Online" if ok else "🔴 Offline")
             if not ok:
@@ -171,84 +217,153 @@ class ChatWindow(tk.Toplevel):
             self.status_var.set("🔴 Offline")
             self._system_banner("❌ No connection information", error=True)
 
-        # Load recent history
-        if self.friend_key:
-             for rec in self.storage.get_messages(self.friend_key, limit=100):
-                side = "right" if rec["dir"] == "out" else "left"
-                self._bubble(rec["msg"], side)
-                self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        # drain lines queued while the window was still being built (after the first history chunk)
+        self.after_idle(self.conn.poll_recv)
 
     # ---------- layout helpers ----------
-    def _on_frame_configure(self, _e=None):
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        self._scroll_to_end()
+    def _on_frame_configure(self, e):
+        # The event carries the frame's new size, so the scrollregion needs no bbox query
+        self._content_size = (e.width, e.height)
+        # Bubbles arriving in a burst each fire <Configure>; update the scrollregion once per idle
+        if self._layout_pending:
+            return
+        self._layout_pending = True
+        self.after_idle(self._apply_layout)
+
+    def _apply_layout(self):
+        self._layout_pending = False
+        width, height = self._content_size
+        self.canvas.configure(scrollregion=(0, 0, width, height))
+        if self._keep_view:
+            self._keep_view = False
+            self.canvas.yview_moveto(0.0)  # earlier messages were just added at the top
+        else:
+            self._scroll_to_end()
 
     def _on_canvas_configure(self, e):
         self.canvas.itemconfig(self.canvas_win, width=e.width)
 
+    def _on_mousewheel(self, e):
+        if e.num == 4:  # X11 wheel up
+            step = -1
+        elif e.num == 5:  # X11 wheel down
+            step = 1
+        else:  # Windows reports multiples of 120, macOS small deltas
+            step = -int(e.delta / 120) or (-1 if e.delta > 0 else 1)
+        if step < 0 and self._evicted and self.canvas.yview()[0] <= 0.0:
+            self._load_earlier()  # scrolled past the top of what is rendered
+            return
+        self.canvas.yview_scroll(step, "units")
+
     def _scroll_to_end(self):
-        self.canvas.update_idletasks()
         self.canvas.yview_moveto(1.0)
 
+    def _load_history_chunk(self):
+        for _ in range(min(HISTORY_CHUNK, len(self._backlog))):
+            self._render_bubble(*self._backlog.popleft())
+        if self._backlog:
+            self.after(1, self._load_history_chunk)
+
     # ---------- Modern UI builders ----------
+    def _take_row(self, entry: Tuple[str, str]) -> Tuple[tk.Frame, tk.Label]:
+        """
+        A row frame + label for the next message, appended at the bottom. Once the
+        row limit is reached the oldest row is unpacked and reused, so long chats
+        reconfigure widgets instead of creating new ones forever; its message is
+        kept so "load earlier" can show it again.
+        """
+        if len(self._rows) >= self._row_limit:
+            row, label, old_entry = self._rows.popleft()
+            row.pack_forget()
+            self._evicted.append(old_entry)
+            if len(self._evicted) == 1:
+                self._earlier_btn.pack(side=tk.TOP, pady=5, before=self._rows[0][0])
+        else:
+            row = tk.Frame(self.msg_frame, bg=self.colors['chat_bg'])
+            label = tk.Label(row, relief="flat")
+        self._rows.append((row, label, entry))
+        return row, label
+
+    def _load_earlier(self):
+        """Render the most recently recycled messages again above the oldest row."""
+        top = self._rows[0][0] if self._rows else None
+        for _ in range(min(EARLIER_CHUNK, len(self._evicted))):
+            entry = self._evicted.pop()
+            row = tk.Frame(self.msg_frame, bg=self.colors['chat_bg'])
+            label = tk.Label(row, relief="flat")
+            row_options = self._fill_row(label, *entry)
+            if top is None:
+                row.pack(**row_options)
+            else:
+                row.pack(before=top, **row_options)
+            self._rows.appendleft((row, label, entry))
+            top = row
+        # the user asked for these: keep them rather than recycling them straight away
+        self._row_limit = max(self._row_limit, len(self._rows))
+        if not self._evicted:
+            self._earlier_btn.pack_forget()
+        self._keep_view = True
+
     def _bubble(self, text: str, side: str):
-        # Message container
-        message_row = tk.Frame(self.msg_frame, bg=self.colors['chat_bg'])
-        message_row.pack(fill=tk.X, padx=15, pady=3)
+        if self._backlog:
+            # history still loading: keep order by rendering after it
+            self._backlog.append((text, side))
+        else:
+            self._render_bubble(text, side)
+
+    def _render_bubble(self, text: str, side: str):
+        row, label = self._take_row((text, side))
+        row.pack(**self._fill_row(label, text, side))
+
+    def _fill_row(self, label: tk.Label, text: str, side: str) -> dict:
+        """Style label for a (text, side) entry; returns the pack options for its row."""
+        if side in ("system", "error"):
+            return self._fill_banner(label, text, side == "error")
 
-        # Message bubble container
-        bubble_container = tk.Frame(message_row, bg=self.colors['chat_bg'])
-        
         if side == "left":
             # Peer message (left side)
-            bubble_container.pack(side=tk.LEFT, anchor="w")
             bubble_bg = self.colors['peer_bubble']
-            text_color = self.colors['text_primary']
-            bubble_anchor = "w"
-            max_width = 400
+            pack_side = tk.LEFT
         else:
             # My message (right side)
-            bubble_container.pack(side=tk.RIGHT, anchor="e")
             bubble_bg = self.colors['my_bubble']
-            text_color = self.colors['text_primary']
-            bubble_anchor = "e"
-            max_width = 400
-
-        # Create bubble with rounded corners effect
-        bubble_frame = tk.Frame(bubble_container, bg=bubble_bg, relief="flat", bd=1)
-        bubble_frame.pack(anchor=bubble_anchor, padx=5)
-
-        # Message text
-        message_label = tk.Label(
-            bubble_frame, text=text, bg=bubble_bg, fg=text_color, 
-            justify="left", wraplength=max_width,
-            padx=15, pady=12, font=("Segoe UI", 11),
+            pack_side = tk.RIGHT
+
+        # Message text, drawn as the bubble itself
+        label.configure(
+            text=text, bg=bubble_bg, fg=self.colors['text_primary'],
+            justify="left", wraplength=400,
+            padx=15, pady=12, font=self.fonts['bubble'],
             anchor="w"
         )
-        message_label.pack()
-
-        # Add some spacing between messages
-        spacer = tk.Frame(self.msg_frame, bg=self.colors['chat_bg'], height=5)
-        spacer.pack(fill=tk.X)
+        label.pack(side=pack_side, padx=5)
+        # bottom padding stands in for the spacer between messages
+        return {"fill": tk.X, "padx": 15, "pady": (3, 8)}
 
     def _system_banner(self, text: str, error: bool = False):
-        # System message container
-        system_row = tk.Frame(self.msg_frame, bg=self.colors['chat_bg'])
-        system_row.pack(fill=tk.X, padx=20, pady=5)
-        
+        self._bubble(text, "error" if error else "system")
+
+    def _fill_banner(self, system_pill: tk.Label, text: str, error: bool) -> dict:
         # System message banner
         banner_bg = "#FFF3CD" if not error else "#F8D7DA"
         banner_fg = "#856404" if not error else "#721C24"
         
-        system_pill = tk.Label(
-            system_row, text=text,
+        system_pill.configure(
+            text=text,
             bg=banner_bg, fg=banner_fg, 
-            font=("Segoe UI", 9, "bold"),
-            padx=12, pady=6, relief="flat"
+            justify="center", wraplength=0,
+            font=self.fonts['banner'],
+            padx=12, pady=6, anchor="center"
         )
-        system_pill.pack()
+        system_pill.pack(side=tk.TOP, padx=0)
+        return {"fill": tk.X, "padx": 20, "pady": 5}
 
     # ---------- network → UI ----------
+    def _ingest_lines(self, lines: List[str]):
+        for line in lines:
+            self._ingest_line(line)
+
     def _ingest_line(self, line: str):
         if line.startswith("[system]"):
             self._system_banner(line)
@@ -261,9 +376,12 @@ class ChatWindow(tk.Toplevel):
                 self.storage.add_message(self.friend_key, "in", line)
 
 
-    def _poll_recv(self):
+    def _notify_recv(self):
+        # may run on the I/O thread; tkinter marshals the call to the Tk thread
+        self.event_generate("<<PeerData>>", when="tail")
+
+    def _on_peer_data(self, _e=None):
         self.conn.poll_recv()
-        self.after(80, self._poll_recv)
 
     # ---------- send ----------
     def on_send(self, event=None):
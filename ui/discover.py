@@ -1,18 +1,38 @@
 #!/usr/bin/env python3
 from __future__ import annotations
+import functools
 import queue
 import random
 import time
 import tkinter as tk
+from collections import namedtuple
+from tkinter import font as tkfont
 from tkinter import ttk, messagebox
 from typing import Optional
 
+try:
+    from PIL import Image, ImageDraw, ImageFont, ImageTk  # optional: drawn avatars
+except ImportError:  # rows fall back to a plain text initial
+    Image = None
+
 from net.presence import Presence
 from net.inbox import InboxServer
 from net.global_discovery import GlobalDiscovery
 from ui.chat_window import ChatWindow
 from storage import Storage
 
+LAST_SEEN = "Last seen: "
+AVATAR_SIZE = 34  # px; fits Contacts.Treeview's rowheight
+
+# tab -> (title, initial count text, header note, contact type)
+TAB_SPECS = {
+    "online": ("🌐 Online Users", "0 users online", None, "online"),
+    "global": ("🌍 Global Network Users", "0 users online", "(Requires internet connection)", "global"),
+    "friends": ("👥 Your Friends", "0 friends", None, "friend"),
+}
+TabRefs = namedtuple("TabRefs", "frame tree count_label")
+INCOMING_BATCH = 4  # incoming chats opened per idle pass; the rest follow on the next one
+
 
 class DiscoverApp(tk.Tk):
     """
@@ -48,8 +68,24 @@ class DiscoverApp(tk.Tk):
         
         # Configure root window
         self.configure(bg=self.colors['background'])
+        
+        # Named Tk fonts resolved once and shared by every widget and the list style
+        self.fonts = {
+            'title': tkfont.Font(self, family="Segoe UI", size=24, weight="bold"),
+            'section': tkfont.Font(self, family="Segoe UI", size=14, weight="bold"),
+            'button': tkfont.Font(self, family="Segoe UI", size=12, weight="bold"),
+            'body_bold': tkfont.Font(self, family="Segoe UI", size=11, weight="bold"),
+            'body': tkfont.Font(self, family="Segoe UI", size=11),
+            'small_bold': tkfont.Font(self, family="Segoe UI", size=10, weight="bold"),
+            'hint': tkfont.Font(self, family="Segoe UI", size=10, slant="italic"),
+            'small': tkfont.Font(self, family="Segoe UI", size=10),
+            'tiny': tkfont.Font(self, family="Segoe UI", size=9),
+        }
 
         self.storage = Storage()
+        # friends change only when someone is (re)contacted or removed; refresh then, not on a timer
+        self._friends_refresh_pending = False
+        self.storage.add_change_listener(self._on_friends_changed)
 
         # --- Beautiful Pastel Header ---
         header_frame = tk.Frame(self, bg=self.colors['primary'], height=90)
@@ -66,13 +102,13 @@ class DiscoverApp(tk.Tk):
         
         # App title with better typography
         title_label = tk.Label(header_content, text="💬 P2P Chat", 
-                              font=("Segoe UI", 24, "bold"), 
+                              font=self.fonts['title'], 
                               bg=self.colors['primary'], fg=self.colors['text_primary'])
         title_label.pack(side=tk.LEFT, anchor="w")
         
         # Subtitle
         subtitle_label = tk.Label(header_content, text="Connect • Chat • Discover", 
-                                 font=("Segoe UI", 11), 
+                                 font=self.fonts['body'], 
                                  bg=self.colors['primary'], fg=self.colors['text_secondary'])
         subtitle_label.pack(side=tk.LEFT, anchor="w", padx=(10, 0), pady=(5, 0))
         
@@ -82,13 +118,13 @@ class DiscoverApp(tk.Tk):
         
         # Display name input with rounded appearance
         name_label = tk.Label(user_section, text="👤 Your Name:", 
-                             font=("Segoe UI", 11, "bold"), 
+                             font=self.fonts['body_bold'], 
                              bg=self.colors['primary'], fg=self.colors['text_primary'])
         name_label.pack(side=tk.LEFT, padx=(0, 10))
         
         self.name_var = tk.StringVar(value=f"User-{random.randint(100,999)}")
         name_entry = tk.Entry(user_section, textvariable=self.name_var, width=18,
-                             font=("Segoe UI", 11), relief="flat", bd=2,
+                             font=self.fonts['body'], relief="flat", bd=2,
                              bg=self.colors['surface'], fg=self.colors['text_primary'],
                              highlightthickness=2, highlightcolor=self.colors['accent'],
                              highlightbackground=self.colors['border'])
@@ -97,7 +133,7 @@ class DiscoverApp(tk.Tk):
         # Online button with better styling
         self.go_btn = tk.Button(user_section, text="🚀 Go Online", 
                                command=self.on_start,
-                               font=("Segoe UI", 11, "bold"),
+                               font=self.fonts['body_bold'],
                                bg=self.colors['secondary'], fg=self.colors['text_primary'],
                                activebackground=self.colors['primary_dark'],
                                activeforeground=self.colors['text_primary'],
@@ -108,7 +144,7 @@ class DiscoverApp(tk.Tk):
         # Status indicator with emoji
         self.status_var = tk.StringVar(value="⚪ Offline")
         status_label = tk.Label(user_section, textvariable=self.status_var,
-                               font=("Segoe UI", 11, "bold"), 
+                               font=self.fonts['body_bold'], 
                                bg=self.colors['primary'], fg=self.colors['text_secondary'])
         status_label.pack(side=tk.RIGHT)
 
@@ -123,7 +159,7 @@ class DiscoverApp(tk.Tk):
         
         # Tab buttons with improved styling
         self.tab_online = tk.Button(tab_frame, text="🏠 Local Network", 
-                                   font=("Segoe UI", 12, "bold"),
+                                   font=self.fonts['button'],
                                    bg=self.colors['accent'], fg=self.colors['text_primary'],
                                    activebackground=self.colors['primary_dark'],
                                    activeforeground=self.colors['text_primary'],
@@ -133,7 +169,7 @@ class DiscoverApp(tk.Tk):
         self.tab_online.pack(side=tk.LEFT, padx=(0, 3))
         
         self.tab_global = tk.Button(tab_frame, text="🌍 Global Network", 
-                                   font=("Segoe UI", 12, "bold"),
+                                   font=self.fonts['button'],
                                    bg=self.colors['hover'], fg=self.colors['text_secondary'],
                                    activebackground=self.colors['accent'],
                                    activeforeground=self.colors['text_primary'],
@@ -143,7 +179,7 @@ class DiscoverApp(tk.Tk):
         self.tab_global.pack(side=tk.LEFT, padx=(0, 3))
         
         self.tab_friends = tk.Button(tab_frame, text="👥 Friends", 
-                                    font=("Segoe UI", 12, "bold"),
+                                    font=self.fonts['button'],
                                     bg=self.colors['hover'], fg=self.colors['text_secondary'],
                                     activebackground=self.colors['accent'],
                                     activeforeground=self.colors['text_primary'],
@@ -156,10 +192,35 @@ class DiscoverApp(tk.Tk):
         self.content_container = tk.Frame(content_frame, bg=self.colors['background'])
         self.content_container.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
         
-        # Build the content tabs
-        self._build_online_tab()
-        self._build_global_tab()
-        self._build_friends_tab()
+        # Contact lists are ttk.Treeviews: rows are drawn by Tk, not built from widgets
+        style = ttk.Style(self)
+        style.configure("Contacts.Treeview",
+                        background=self.colors['surface'], fieldbackground=self.colors['surface'],
+                        foreground=self.colors['text_primary'], rowheight=44,
+                        font=self.fonts['body'], borderwidth=0)
+        style.configure("Contacts.Treeview.Heading",
+                        background=self.colors['hover'], foreground=self.colors['text_secondary'],
+                        font=self.fonts['small_bold'], relief="flat")
+        style.map("Contacts.Treeview",
+                  background=[("selected", "#E3F2FD")],
+                  foreground=[("selected", self.colors['text_primary'])])
+        
+        # One set of handlers shared by every contact list through the ContactList bindtag
+        self._list_types: dict = {}  # Treeview -> card_type
+        self.bind_class("ContactList", "<<TreeviewSelect>>", self._on_contact_select)
+        self.bind_class("ContactList", "<Double-1>", self._on_contact_double_click)
+        
+        # Context menu for the friends list: remove friend
+        self._friend_menu = tk.Menu(self, tearoff=0)
+        self._friend_menu.add_command(label="🗑️ Remove Friend", command=self._remove_selected_friend)
+        
+        # Tabs are built the first time they are shown; start with the online tab only
+        self._tabs: dict[str, Optional[TabRefs]] = dict.fromkeys(TAB_SPECS)
+        self._tab_buttons = {"online": self.tab_online, "global": self.tab_global,
+                             "friends": self.tab_friends}
+        self._last_styled_tab: Optional[str] = None
+        self._shown_tab: Optional[str] = None
+        self._stale_tabs: set[str] = set()  # built but hidden tabs that skipped a refresh
 
         # Start with online tab active
         self.current_tab = "online"
@@ -176,7 +237,7 @@ class DiscoverApp(tk.Tk):
         
         self.chat_btn = tk.Button(button_frame, text="💬 Start Chat", 
                                  command=self.open_selected,
-                                 font=("Segoe UI", 12, "bold"),
+                                 font=self.fonts['button'],
                                  bg=self.colors['secondary'], fg=self.colors['text_primary'],
                                  activebackground=self.colors['primary_dark'],
                                  activeforeground=self.colors['text_primary'],
@@ -186,7 +247,7 @@ class DiscoverApp(tk.Tk):
         
         refresh_btn = tk.Button(button_frame, text="🔄 Refresh", 
                                command=self.refresh_current_tab,
-                               font=("Segoe UI", 11, "bold"),
+                               font=self.fonts['body_bold'],
                                bg=self.colors['hover'], fg=self.colors['text_primary'],
                                activebackground=self.colors['accent'],
                                activeforeground=self.colors['text_primary'],
@@ -196,7 +257,7 @@ class DiscoverApp(tk.Tk):
         
         # Help text with better styling
         help_label = tk.Label(button_frame, text="💡 Double-click any contact to start chatting",
-                             font=("Segoe UI", 10, "italic"), 
+                             font=self.fonts['hint'], 
                              bg=self.colors['surface'], fg=self.colors['text_secondary'])
         help_label.pack(side=tk.RIGHT, pady=5)
 
@@ -205,133 +266,94 @@ class DiscoverApp(tk.Tk):
         self.presence: Optional[Presence] = None
         self.global_discovery: Optional[GlobalDiscovery] = None
         self._tcp_port: Optional[int] = None
-        self._incoming_queue: "queue.Queue[tuple]" = queue.Queue()
+        self._incoming_queue: "queue.SimpleQueue[tuple]" = queue.SimpleQueue()  # inbox workers -> UI
+        # an inbox worker posts this when it queues a socket; nothing polls while idle
+        self.bind("<<IncomingChat>>", lambda e: self._poll_incoming())
+        # global discovery posts this from its thread; the list is only touched on the UI thread
+        self.bind("<<GlobalPeers>>", lambda e: self.refresh_global())
         self._refresh_job = None
+        # card_type -> {peer_key (row iid): contact data}, in display order; refreshes diff against it
+        self._contacts: dict[str, dict[str, dict]] = {"online": {}, "global": {}, "friend": {}}
+        self.selected_contact: Optional[dict] = None
+        self._selected_tree: Optional[ttk.Treeview] = None  # list holding the highlighted row
+        self._avatars: dict = {}  # (letter, bg) -> PhotoImage, shared by every row
 
-    # ----------------------------- Modern Contact Lists -----------------------------
-    def _build_online_tab(self):
-        # Online users container
-        self.online_frame = tk.Frame(self.content_container, bg=self.colors['background'])
-        
-        # Header for online users
-        online_header = tk.Frame(self.online_frame, bg=self.colors['surface'], height=50)
-        online_header.pack(fill=tk.X, pady=(0, 10))
-        online_header.pack_propagate(False)
-        
-        online_title = tk.Label(online_header, text="🌐 Online Users", 
-                               font=("Segoe UI", 14, "bold"),
-                               bg=self.colors['surface'], fg=self.colors['text_primary'])
-        online_title.pack(side=tk.LEFT, padx=20, pady=15)
-        
-        online_count = tk.Label(online_header, text="0 users online", 
-                               font=("Segoe UI", 10),
-                               bg=self.colors['surface'], fg=self.colors['text_secondary'])
-        online_count.pack(side=tk.RIGHT, padx=20, pady=15)
-        self.online_count_label = online_count
-        
-        # Scrollable frame for contacts
-        canvas = tk.Canvas(self.online_frame, bg=self.colors['background'], highlightthickness=0)
-        scrollbar = tk.Scrollbar(self.online_frame, orient="vertical", command=canvas.yview)
-        self.online_scrollable = tk.Frame(canvas, bg=self.colors['background'])
-        
-        self.online_scrollable.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=self.online_scrollable, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        self.online_canvas = canvas
+        self._show_current_tab()  # its first refresh reads the state above
 
-    def _build_global_tab(self):
-        # Global users container
-        self.global_frame = tk.Frame(self.content_container, bg=self.colors['background'])
-        
-        # Header for global users
-        global_header = tk.Frame(self.global_frame, bg=self.colors['surface'], height=50)
-        global_header.pack(fill=tk.X, pady=(0, 10))
-        global_header.pack_propagate(False)
-        
-        global_title = tk.Label(global_header, text="🌍 Global Network Users", 
-                               font=("Segoe UI", 14, "bold"),
+    # ----------------------------- Modern Contact Lists -----------------------------
+    def _tab(self, name) -> TabRefs:
+        """The widgets of tab name, building them on first use."""
+        tab = self._tabs[name]
+        if tab is None:
+            tab = self._tabs[name] = self._build_list_tab(name)
+        return tab
+
+    def _visible_tab(self, name) -> Optional[TabRefs]:
+        """The widgets of tab name if it is on screen; a hidden tab is marked stale instead."""
+        if name == self._shown_tab:
+            return self._tabs[name]
+        if self._tabs[name] is not None:
+            self._stale_tabs.add(name)
+        return None
+
+    def _build_list_tab(self, name) -> TabRefs:
+        title, count_text, note, card_type = TAB_SPECS[name]
+        frame = tk.Frame(self.content_container, bg=self.colors['background'])
+        
+        # Header: title on the left, count (and optional note) on the right
+        header = tk.Frame(frame, bg=self.colors['surface'], height=50)
+        header.pack(fill=tk.X, pady=(0, 10))
+        header.pack_propagate(False)
+        
+        title_label = tk.Label(header, text=title, 
+                               font=self.fonts['section'],
                                bg=self.colors['surface'], fg=self.colors['text_primary'])
-        global_title.pack(side=tk.LEFT, padx=20, pady=15)
+        title_label.pack(side=tk.LEFT, padx=20, pady=15)
         
-        global_count = tk.Label(global_header, text="0 users online", 
-                               font=("Segoe UI", 10),
+        count_label = tk.Label(header, text=count_text, 
+                               font=self.fonts['small'],
                                bg=self.colors['surface'], fg=self.colors['text_secondary'])
-        global_count.pack(side=tk.RIGHT, padx=20, pady=15)
-        self.global_count_label = global_count
-        
-        # Info text
-        info_text = tk.Label(global_header, text="(Requires internet connection)", 
-                            font=("Segoe UI", 9),
-                            bg=self.colors['surface'], fg=self.colors['text_secondary'])
-        info_text.pack(side=tk.RIGHT, padx=(0, 10), pady=15)
-        
-        # Scrollable frame for contacts
-        canvas = tk.Canvas(self.global_frame, bg=self.colors['background'], highlightthickness=0)
-        scrollbar = tk.Scrollbar(self.global_frame, orient="vertical", command=canvas.yview)
-        self.global_scrollable = tk.Frame(canvas, bg=self.colors['background'])
-        
-        self.global_scrollable.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=self.global_scrollable, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        count_label.pack(side=tk.RIGHT, padx=20, pady=15)
+        
+        if note:
+            note_label = tk.Label(header, text=note, 
+                                  font=self.fonts['tiny'],
+                                  bg=self.colors['surface'], fg=self.colors['text_secondary'])
+            note_label.pack(side=tk.RIGHT, padx=(0, 10), pady=15)
+        
+        tree = self._make_contact_tree(frame, card_type)
+        if card_type == "friend":
+            tree.bind("<Button-3>", self._popup_friend_menu)
+        return TabRefs(frame, tree, count_label)
+
+    def _make_contact_tree(self, parent, card_type):
+        """A scrollable contact list; row iids are peer keys into self._contacts[card_type]."""
+        tree = ttk.Treeview(parent, columns=("name", "status", "endpoint"),
+                            show="tree headings", selectmode="browse", style="Contacts.Treeview")
+        tree.heading("#0", text="")
+        tree.column("#0", width=60, minwidth=60, stretch=False, anchor="center")
+        tree.heading("name", text="Name", anchor="w")
+        tree.column("name", width=200, anchor="w")
+        tree.heading("status", text="Status", anchor="w")
+        tree.column("status", width=220, anchor="w")
+        tree.heading("endpoint", text="Address", anchor="w")
+        tree.column("endpoint", width=180, anchor="w")
+        
+        scrollbar = ttk.Scrollbar(parent, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        self.global_canvas = canvas
+        tree.bindtags(("ContactList",) + tree.bindtags())
+        self._list_types[tree] = card_type
+        return tree
 
-    def _build_friends_tab(self):
-        # Friends container
-        self.friends_frame = tk.Frame(self.content_container, bg=self.colors['background'])
-        
-        # Header for friends
-        friends_header = tk.Frame(self.friends_frame, bg=self.colors['surface'], height=50)
-        friends_header.pack(fill=tk.X, pady=(0, 10))
-        friends_header.pack_propagate(False)
-        
-        friends_title = tk.Label(friends_header, text="👥 Your Friends", 
-                                font=("Segoe UI", 14, "bold"),
-                                bg=self.colors['surface'], fg=self.colors['text_primary'])
-        friends_title.pack(side=tk.LEFT, padx=20, pady=15)
-        
-        friends_count = tk.Label(friends_header, text="0 friends", 
-                                font=("Segoe UI", 10),
-                                bg=self.colors['surface'], fg=self.colors['text_secondary'])
-        friends_count.pack(side=tk.RIGHT, padx=20, pady=15)
-        self.friends_count_label = friends_count
-        
-        # Scrollable frame for contacts
-        canvas = tk.Canvas(self.friends_frame, bg=self.colors['background'], highlightthickness=0)
-        scrollbar = tk.Scrollbar(self.friends_frame, orient="vertical", command=canvas.yview)
-        self.friends_scrollable = tk.Frame(canvas, bg=self.colors['background'])
-        
-        self.friends_scrollable.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=self.friends_scrollable, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        self.friends_canvas = canvas
+    def _on_contact_select(self, event):
+        self._select_contact(event.widget, self._list_types[event.widget])
 
-        # Context menu: remove friend
-        self._friend_menu = tk.Menu(self, tearoff=0)
-        self._friend_menu.add_command(label="🗑️ Remove Friend", command=self._remove_selected_friend)
+    def _on_contact_double_click(self, event):
+        if event.widget.identify_row(event.y):  # ignore double-clicks on headings / empty space
+            self.open_selected()
 
     # --------------------------- Tab Management ---------------------------
     def show_online_tab(self):
@@ -350,32 +372,34 @@ class DiscoverApp(tk.Tk):
         self._show_current_tab()
     
     def _update_tab_styling(self):
-        # Reset all tabs
-        self.tab_online.configure(bg=self.colors['border'], fg=self.colors['text_secondary'])
-        self.tab_global.configure(bg=self.colors['border'], fg=self.colors['text_secondary'])
-        self.tab_friends.configure(bg=self.colors['border'], fg=self.colors['text_secondary'])
+        if self._last_styled_tab == self.current_tab:
+            return  # clicked the active tab
+        
+        # Reset the previously highlighted tab (all of them the first time)
+        previous = self._last_styled_tab
+        for name in (self._tab_buttons if previous is None else (previous,)):
+            self._tab_buttons[name].configure(bg=self.colors['border'], fg=self.colors['text_secondary'])
         
         # Highlight current tab
-        if self.current_tab == "online":
-            self.tab_online.configure(bg=self.colors['accent'], fg="white")
-        elif self.current_tab == "global":
-            self.tab_global.configure(bg=self.colors['accent'], fg="white")
-        else:  # friends
-            self.tab_friends.configure(bg=self.colors['accent'], fg="white")
+        self._tab_buttons[self.current_tab].configure(bg=self.colors['accent'], fg="white")
+        self._last_styled_tab = self.current_tab
     
     def _show_current_tab(self):
-        # Hide all tabs
-        self.online_frame.pack_forget()
-        self.global_frame.pack_forget()
-        self.friends_frame.pack_forget()
+        if self._shown_tab == self.current_tab:
+            return
         
-        # Show current tab
-        if self.current_tab == "online":
-            self.online_frame.pack(fill=tk.BOTH, expand=True)
-        elif self.current_tab == "global":
-            self.global_frame.pack(fill=tk.BOTH, expand=True)
-        else:  # friends
-            self.friends_frame.pack(fill=tk.BOTH, expand=True)
+        # Hide the tab on screen
+        if self._shown_tab is not None:
+            self._tabs[self._shown_tab].frame.pack_forget()
+        self._shown_tab = self.current_tab
+        
+        # Show current tab, building it on first visit; fill it if it missed refreshes
+        name = self.current_tab
+        needs_refresh = self._tabs[name] is None or name in self._stale_tabs
+        self._tab(name).frame.pack(fill=tk.BOTH, expand=True)
+        if needs_refresh:
+            self._stale_tabs.discard(name)
+            self.refresh_current_tab()
 
     # --------------------------- lifecycle ---------------------------
     def on_start(self):
@@ -396,7 +420,7 @@ class DiscoverApp(tk.Tk):
         self.global_discovery = GlobalDiscovery(
             name=name, 
             tcp_port=self._tcp_port,
-            on_peer_update=self.refresh_global
+            on_peer_update=self._on_global_peers
         )
         self.global_discovery.start()
 
@@ -409,16 +433,26 @@ class DiscoverApp(tk.Tk):
         self.refresh_global()
         self.refresh_friends()
         self._schedule_refresh()
-        self.after(100, self._poll_incoming)
 
     def _schedule_refresh(self):
         self._refresh_job = self.after(1200, self._refresh_loop)
 
     def _refresh_loop(self):
+        # Only the LAN list needs a timer: global refreshes on <<GlobalPeers>> and friends on
+        # storage changes. While it is hidden this just marks it stale for its next showing.
         self.refresh_online()
-        self.refresh_friends()
         self._schedule_refresh()
 
+    def _on_friends_changed(self):
+        # storage mutations happen on the UI thread; coalesce a burst into one refresh
+        if not self._friends_refresh_pending:
+            self._friends_refresh_pending = True
+            self.after_idle(self._refresh_friends_idle)
+
+    def _refresh_friends_idle(self):
+        self._friends_refresh_pending = False
+        self.refresh_friends()
+
     # --------------------------- refreshers --------------------------
     def refresh_current_tab(self):
         if self.current_tab == "online":
@@ -429,173 +463,167 @@ class DiscoverApp(tk.Tk):
             self.refresh_friends()
 
     def refresh_online(self):
-        if not self.presence:
+        tab = self._visible_tab("online")
+        if not self.presence or tab is None:
             return
         
-        # Clear existing contacts
-        for widget in self.online_scrollable.winfo_children():
-            widget.destroy()
-        
         peers = self.presence.get_active_peers()
-        self.online_count_label.configure(text=f"{len(peers)} users online")
+        tab.count_label.configure(text=f"{len(peers)} users online")
         
         now = time.time()
-        for p in peers:
-            last = max(0, now - p["last_seen"])
-            self._create_contact_card(self.online_scrollable, p["name"], p["ip"], p["port"], 
-                                    f"Last seen: {last:0.1f}s ago", "online")
+        entries = [(p["name"], p["ip"], p["port"],
+                    f"{LAST_SEEN}{max(0, now - p['last_seen']):.1f}s ago", None)
+                   for p in peers]
+        self._sync_rows(tab.tree, "online", entries)
 
     def refresh_global(self):
         """Refresh global network users."""
-        if not self.global_discovery:
+        tab = self._visible_tab("global")
+        if not self.global_discovery or tab is None:
             return
         
-        # Clear existing contacts
-        for widget in self.global_scrollable.winfo_children():
-            widget.destroy()
-        
         peers = self.global_discovery.get_global_peers()
-        self.global_count_label.configure(text=f"{len(peers)} users online globally")
+        tab.count_label.configure(text=f"{len(peers)} users online globally")
         
-        for p in peers:
-            last_seen = time.time() - p.get('last_seen', 0)
-            self._create_contact_card(self.global_scrollable, p["name"], p["public_ip"], p["tcp_port"], 
-                                    f"Last seen: {last_seen:0.1f}s ago", "global")
+        now = time.time()  # once per refresh, not per peer
+        entries = [(p["name"], p["public_ip"], p["tcp_port"],
+                    f"{LAST_SEEN}{now - p.get('last_seen', 0):.1f}s ago", None)
+                   for p in peers]
+        self._sync_rows(tab.tree, "global", entries)
 
     def refresh_friends(self):
-        # Clear existing contacts
-        for widget in self.friends_scrollable.winfo_children():
-            widget.destroy()
+        tab = self._visible_tab("friends")
+        if tab is None:
+            return  # filled when next shown
         
         friends = self.storage.get_friends()
-        self.friends_count_label.configure(text=f"{len(friends)} friends")
-        
-        for f in friends:
-            last_seen = f.get("last_seen") or "Never"
-            self._create_contact_card(self.friends_scrollable, f["name"], f["ip"], f["port"], 
-                                    f"Last seen: {last_seen}", "friend", f)
-    
-    def _create_contact_card(self, parent, name, ip, port, status_text, card_type, friend_data=None):
-        """Create a beautiful pastel contact card"""
-        # Contact card container with subtle border
-        card_frame = tk.Frame(parent, bg=self.colors['surface'], relief="flat", bd=1,
-                             highlightthickness=1, highlightbackground=self.colors['border'])
-        card_frame.pack(fill=tk.X, padx=12, pady=8)
-        card_frame.pack_propagate(False)
-        card_frame.configure(height=80)
-        
-        # Beautiful avatar with gradient-like effect
-        avatar_frame = tk.Frame(card_frame, bg=self.colors['secondary'], width=55, height=55,
-                               relief="flat", bd=0)
-        avatar_frame.pack(side=tk.LEFT, padx=18, pady=12)
-        avatar_frame.pack_propagate(False)
-        
-        # Get first letter of name for avatar with better styling
-        initial = name[0].upper() if name else "?"
-        avatar_label = tk.Label(avatar_frame, text=initial, 
-                               font=("Segoe UI", 18, "bold"),
-                               bg=self.colors['secondary'], fg=self.colors['text_primary'])
-        avatar_label.pack(expand=True)
-        
-        # Contact info with better spacing
-        info_frame = tk.Frame(card_frame, bg=self.colors['surface'])
-        info_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 15), pady=12)
-        
-        # Name with improved typography
-        name_label = tk.Label(info_frame, text=name, 
-                             font=("Segoe UI", 13, "bold"),
-                             bg=self.colors['surface'], fg=self.colors['text_primary'])
-        name_label.pack(anchor="w", pady=(0, 2))
-        
-        # Status with better styling
-        status_label = tk.Label(info_frame, text=status_text, 
-                               font=("Segoe UI", 10),
-                               bg=self.colors['surface'], fg=self.colors['text_secondary'])
-        status_label.pack(anchor="w", pady=(0, 2))
-        
-        # IP info with subtle styling
-        ip_label = tk.Label(info_frame, text=f"📍 {ip}:{port}", 
-                           font=("Segoe UI", 9),
-                           bg=self.colors['surface'], fg=self.colors['text_secondary'])
-        ip_label.pack(anchor="w")
-        
-        # Beautiful online indicator
-        if card_type == "online":
-            indicator = tk.Label(card_frame, text="🟢", font=("Segoe UI", 14),
-                               bg=self.colors['surface'])
-            indicator.pack(side=tk.RIGHT, padx=18, pady=30)
-        elif card_type == "global":
-            indicator = tk.Label(card_frame, text="🌍", font=("Segoe UI", 14),
-                               bg=self.colors['surface'])
-            indicator.pack(side=tk.RIGHT, padx=18, pady=30)
-        
-        # Bind events
-        def on_click(event):
-            self._select_contact(card_frame, name, ip, port)
-        
-        def on_double_click(event):
-            self.open_selected()
-        
-        card_frame.bind("<Button-1>", on_click)
-        card_frame.bind("<Double-1>", on_double_click)
-        
-        # Make all child widgets clickable too
-        for widget in [avatar_frame, avatar_label, info_frame, name_label, status_label, ip_label]:
-            widget.bind("<Button-1>", on_click)
-            widget.bind("<Double-1>", on_double_click)
-        
-        # Store contact data
-        card_frame.contact_data = {"name": name, "ip": ip, "port": port, "type": card_type}
-        if friend_data:
-            card_frame.contact_data["friend_data"] = friend_data
+        tab.count_label.configure(text=f"{len(friends)} friends")
+        
+        entries = [(f["name"], f["ip"], f["port"], f"{LAST_SEEN}{f.get('last_seen') or 'Never'}", f)
+                   for f in friends]
+        self._sync_rows(tab.tree, "friend", entries)
+
+    def _sync_rows(self, tree, card_type, entries):
+        """
+        Bring a list's rows in line with entries [(name, ip, port, status_text, friend_data)]:
+        delete rows whose peer left, insert rows for new peers and only update the values
+        of rows whose status changed. Rows are moved only when the order changed.
+        """
+        contacts = self._contacts[card_type]
+        indicator = {"online": "🟢 ", "global": "🌍 "}.get(card_type, "")
+        wanted = {Storage.make_peer_key(e[0], e[1], e[2]): e for e in entries}
+        
+        gone = [k for k in contacts if k not in wanted]
+        if gone:
+            tree.delete(*gone)
+            for key in gone:
+                del contacts[key]
+        
+        for key, (name, ip, port, status_text, friend_data) in wanted.items():
+            contact = contacts.get(key)
+            if contact is None:
+                contacts[key] = contact = {"name": name, "ip": ip, "port": port, "type": card_type}
+                initial = name[0].upper() if name else "?"
+                avatar = self._avatar_image(initial, self.colors['secondary'])
+                tree.insert("", "end", iid=key, text="" if avatar else initial, image=avatar or "",
+                            values=(name, indicator + status_text, f"📍 {ip}:{port}"))
+            elif contact["status_text"] != status_text:
+                tree.set(key, "status", indicator + status_text)
+            contact["status_text"] = status_text
+            if friend_data:
+                contact["friend_data"] = friend_data
+        
+        if list(contacts) != list(wanted):
+            # membership or sort order changed: move rows into the wanted order
+            for index, key in enumerate(wanted):
+                tree.move(key, "", index)
+            self._contacts[card_type] = {key: contacts[key] for key in wanted}
     
-    def _select_contact(self, card_frame, name, ip, port):
+    def _avatar_image(self, letter, bg):
+        """Round initial-letter avatar, rendered once per (letter, bg); None without Pillow."""
+        key = (letter, bg)
+        if key in self._avatars or Image is None:
+            return self._avatars.get(key)
+        image = None
+        try:
+            scale = 3  # draw large and downsample for smooth edges
+            size = AVATAR_SIZE * scale
+            img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+            draw = ImageDraw.Draw(img)
+            draw.ellipse((0, 0, size - 1, size - 1), fill=bg)
+            draw.text((size / 2, size / 2), letter, fill=self.colors['text_primary'],
+                      font=self._avatar_font(size // 2), anchor="mm")
+            image = ImageTk.PhotoImage(img.resize((AVATAR_SIZE, AVATAR_SIZE), Image.LANCZOS),
+                                       master=self)
+        except Exception:
+            pass  # e.g. an old Pillow without anchor support: keep the text initial
+        self._avatars[key] = image
+        return image
+
+    @staticmethod
+    def _avatar_font(size):
+        for name in ("segoeuib.ttf", "DejaVuSans-Bold.ttf", "Arial Bold.ttf"):
+            try:
+                return ImageFont.truetype(name, size)
+            except OSError:
+                continue
+        return ImageFont.load_default()
+
+    def _select_contact(self, tree, card_type):
         """Handle contact selection"""
-        # Reset all card backgrounds
-        if self.current_tab == "online":
-            for widget in self.online_scrollable.winfo_children():
-                if hasattr(widget, 'contact_data'):
-                    widget.configure(bg=self.colors['surface'])
-        elif self.current_tab == "global":
-            for widget in self.global_scrollable.winfo_children():
-                if hasattr(widget, 'contact_data'):
-                    widget.configure(bg=self.colors['surface'])
-        else:
-            for widget in self.friends_scrollable.winfo_children():
-                if hasattr(widget, 'contact_data'):
-                    widget.configure(bg=self.colors['surface'])
-        
-        # Highlight selected card
-        card_frame.configure(bg="#E3F2FD")
+        selection = tree.selection()
+        contact = self._contacts[card_type].get(selection[0]) if selection else None
+        if contact is None:
+            return
+        # Only the list that held the previous selection needs clearing, not every row
+        previous = self._selected_tree
+        if previous is not None and previous is not tree:
+            previous.selection_remove(*previous.selection())
+        self._selected_tree = tree
         
         # Store selected contact
-        self.selected_contact = {"name": name, "ip": ip, "port": port}
+        self.selected_contact = {"name": contact["name"], "ip": contact["ip"], "port": contact["port"]}
+
+    def _on_global_peers(self):
+        # called by the global discovery thread; wake the UI thread to refresh
+        try:
+            self.event_generate("<<GlobalPeers>>", when="tail")
+        except Exception:
+            pass  # window is closing
 
     # ---------------------- incoming connections ---------------------
     def _on_incoming_socket(self, conn, addr):
-        # called by server thread; push to queue for UI thread
+        # called by an inbox callback worker; push to queue for UI thread and wake it
         self._incoming_queue.put((conn, addr))
+        try:
+            self.event_generate("<<IncomingChat>>", when="tail")
+        except Exception:
+            pass  # window is closing; the socket stays queued rather than being closed
 
     def _poll_incoming(self):
         try:
-            while True:
+            for _ in range(INCOMING_BATCH):
                 conn, addr = self._incoming_queue.get_nowait()
-                ip, port = addr[0], addr[1]
-                # save/update friend
-                self.storage.upsert_friend(ip, ip, port)
-                # open a chat window that adopts this socket
-                ChatWindow(
-                    self, title=f"Chat ← {ip}:{port}", adopt=(conn, addr),
-                    peer_name=ip, storage=self.storage
-                )
+                # windows are built when idle, so the event handler returns straight away
+                self.after_idle(functools.partial(self._spawn_chat_window, conn, addr))
         except queue.Empty:
-            pass
-        finally:
-            self.after(150, self._poll_incoming)
+            return
+        if not self._incoming_queue.empty():
+            self.after_idle(self._poll_incoming)  # more than one batch queued: continue when idle
+
+    def _spawn_chat_window(self, conn, addr):
+        ip, port = addr[0], addr[1]
+        # save/update friend
+        self.storage.upsert_friend(ip, ip, port)
+        # open a chat window that adopts this socket
+        ChatWindow(
+            self, title=f"Chat ← {ip}:{port}", adopt=(conn, addr),
+            peer_name=ip, storage=self.storage
+        )
 
     # ------------------------------ actions ------------------------------
     def open_selected(self):
-        if not hasattr(self, 'selected_contact') or not self.selected_contact:
+        if self.selected_contact is None:
             messagebox.showinfo("Select a contact", "Please select a contact first.")
             return
         
@@ -620,13 +648,16 @@ class DiscoverApp(tk.Tk):
         )
 
     def _popup_friend_menu(self, event):
-        # Find the contact card under the cursor
-        widget = event.widget.winfo_containing(event.x_root, event.y_root)
-        if widget and hasattr(widget, 'contact_data'):
+        # Select the friend row under the cursor, then offer to remove it
+        tree = event.widget
+        row = tree.identify_row(event.y)
+        if row:
+            tree.selection_set(row)
+            self._select_contact(tree, "friend")
             self._friend_menu.tk_popup(event.x_root, event.y_root)
 
     def _remove_selected_friend(self):
-        if not hasattr(self, 'selected_contact') or not self.selected_contact:
+        if self.selected_contact is None:
             return
         
         contact = self.selected_contact
@@ -641,7 +672,7 @@ class DiscoverApp(tk.Tk):
         
         # Confirm removal
         if messagebox.askyesno("Remove Friend", f"Remove {name} from your friends list?"):
-            key = Storage.make_key(name, ip, port)
+            key = Storage.make_peer_key(name, ip, port)
             self.storage.remove_friend(key)
             self.refresh_friends()
             self.selected_contact = None